@@ -0,0 +1,59 @@
+"""Benchmark script to measure the response cache of http_session.py for repeated dashboard queries"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from frosta.http_session import FrostHTTPSession, ResponseCache
+from benchmark_http import create_mock_page, measure
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Serves the mock page after a simulated query time, with an ETag if enabled"""
+    body = b''
+    etag = None
+    query_time = 0.02
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(self.query_time)
+        if self.etag is not None and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if self.etag is not None:
+            self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Benchmark
+if __name__ == "__main__":
+    QueryHandler.body = create_mock_page(10000)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), QueryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/v1.1/Observations?$top=10000&$orderby=phenomenonTime asc'
+
+    print(f"Benchmarking repeated queries ({len(QueryHandler.body) / 1e6:.2f} MB page, "
+          f"{QueryHandler.query_time * 1000:.0f} ms server query time)")
+    print("=" * 60)
+    scenarios = [
+        ('no cache', None, None),
+        ('cache, ETag', ResponseCache(), hashlib.md5(QueryHandler.body).hexdigest()),
+        ('cache, ttl=60s', ResponseCache(ttl=60), None)
+    ]
+    for name, cache, etag in scenarios:
+        QueryHandler.etag = f'"{etag}"' if etag is not None else None
+        with FrostHTTPSession(compression=False, cache=cache) as session:
+            elapsed = measure(lambda: session.get(url).json(), iterations=20)
+            stats = session.stats
+            print(f"{name:15s}: {elapsed:7.2f} ms/query, {stats.requests:2d} requests, "
+                  f"{stats.wire_bytes / 1e6:5.2f} MB on wire")
+    server.shutdown()
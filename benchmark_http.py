@@ -0,0 +1,84 @@
+"""Benchmark script to measure compression and JSON decoding in http_session.py"""
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from frosta.http_session import FrostHTTPSession, JSON_DECODERS, get_json_decoder
+
+
+def create_mock_page(count=1000):
+    """Create the JSON body of an Observations page as returned by FROST"""
+    base_time = 1704067200
+    value = [
+        {
+            '@iot.id': i,
+            'phenomenonTime': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(base_time + 60 * i)),
+            'result': 20.0 + (i % 10) * 0.1,
+            'Datastream': {'@iot.id': 'test-datastream-001'}
+        }
+        for i in range(count)
+    ]
+    return json.dumps({'@iot.count': count, 'value': value}).encode('utf-8')
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serves the mock page, gzip-compressed if the client accepts it"""
+    body = b''
+    compressed = b''
+
+    def do_GET(self):
+        body = self.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = self.compressed
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(function, iterations=10):
+    function()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+# Benchmark
+if __name__ == "__main__":
+    sizes = [1000, 10000, 50000]
+
+    print("Benchmarking JSON decoding of Observation pages")
+    print("=" * 60)
+    decoders = []
+    for name in JSON_DECODERS:
+        resolved, loads = get_json_decoder(name)
+        if resolved == name:
+            decoders.append((name, loads))
+    for size in sizes:
+        body = create_mock_page(size)
+        timings = [f"{name}: {measure(lambda: loads(body)):7.2f} ms" for name, loads in decoders]
+        print(f"{size:6d} observations ({len(body) / 1e6:5.2f} MB): " + ', '.join(timings))
+
+    print("\nBenchmarking transfer through FrostHTTPSession")
+    print("=" * 60)
+    PageHandler.body = create_mock_page(sizes[-1])
+    PageHandler.compressed = gzip.compress(PageHandler.body)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/v1.1/Observations'
+
+    for compression, json_decoder in [(False, 'json'), (True, 'json'), (True, 'auto')]:
+        with FrostHTTPSession(compression=compression, json_decoder=json_decoder) as session:
+            elapsed = measure(lambda: session.get(url).json())
+            stats = session.stats
+            print(f"compression={str(compression):5s} decoder={session.json_decoder:8s}: "
+                  f"{elapsed:7.2f} ms/page, {stats.wire_bytes / stats.requests / 1e6:5.2f} MB on wire, "
+                  f"ratio {stats.compression_ratio:4.1f}")
+    server.shutdown()
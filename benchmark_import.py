@@ -0,0 +1,44 @@
+"""Benchmark script to measure import time of frosta and guard lazy loading of heavy dependencies"""
+import subprocess
+import sys
+
+HEAVY_MODULES = ['pandas', 'numpy', 'pytz']
+
+SCENARIOS = [
+    ('import frosta', 'import frosta'),
+    ('create client', 'from frosta import FrostClient; FrostClient("http://localhost:8080/FROST-Server/v1.1")'),
+    ('time series', 'from frosta import FrostClient, as_time_series; import pandas'),
+]
+
+
+def measure(statement, iterations=5):
+    """Best wall time of statement in a fresh interpreter and the heavy modules it loaded"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    best = None
+    for _ in range(iterations):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        elapsed, loaded = output.strip().split(' ') if ' ' in output.strip() else (output.strip(), '')
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+    return best * 1000, [m for m in loaded.split(',') if m]
+
+
+# Benchmark
+if __name__ == "__main__":
+    print("Benchmarking import time (best of 5 fresh interpreters)")
+    print("=" * 60)
+    regressions = []
+    for name, statement in SCENARIOS:
+        elapsed, loaded = measure(statement)
+        print(f"{name:14s}: {elapsed:7.1f} ms, heavy modules loaded: {', '.join(loaded) or 'none'}")
+        if name != 'time series' and len(loaded) > 0:
+            regressions.append(name)
+
+    if len(regressions) > 0:
+        print(f"\nRegression: {', '.join(regressions)} imported {', '.join(HEAVY_MODULES)} eagerly")
+        sys.exit(1)
@@ -0,0 +1,87 @@
+"""Benchmark script to count the requests of relation lookups in relations.py and guard expanded relations"""
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote_plus
+from frosta import FrostClient
+
+DATASTREAMS = 100
+SENSORS = 20
+
+
+def create_datastream(i):
+    """Datastream as returned with the default expansion of get_datastreams"""
+    return {
+        '@iot.id': i,
+        'name': f'Datastream {i}',
+        'Thing': {'@iot.id': i, 'Locations': [{'@iot.id': i, 'name': f'Location {i}',
+                                               'location': {'type': 'Point', 'coordinates': [8.0, 50.0]}}]},
+        'ObservedProperty': {'@iot.id': i % SENSORS, 'name': f'Property {i % SENSORS}'}
+    }
+
+
+def create_sensor(i, datastream_ids):
+    return {'@iot.id': i, 'name': f'Sensor {i}', 'Datastreams': [{'@iot.id': id} for id in datastream_ids]}
+
+
+class RelationHandler(BaseHTTPRequestHandler):
+    """Serves Datastreams and the Sensors of the requested Datastreams, counting the requests"""
+    requests = 0
+    query_time = 0.002
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        RelationHandler.requests += 1
+        time.sleep(self.query_time)
+        path = self.path.split('?')[0]
+        if path.endswith('/Datastreams'):
+            value = [create_datastream(i) for i in range(DATASTREAMS)]
+        else:
+            datastream_ids = {int(id) for id in re.findall(r"'(\d+)' eq", unquote_plus(self.path))}
+            value = [create_sensor(s, [id for id in sorted(datastream_ids) if id % SENSORS == s]) for s in range(SENSORS)]
+            value = [sensor for sensor in value if len(sensor['Datastreams']) > 0]
+        body = json.dumps({'value': value}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def count_requests(function):
+    """Wall time in ms and number of requests of function"""
+    requests = RelationHandler.requests
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000, RelationHandler.requests - requests
+
+
+# Benchmark
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RelationHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = FrostClient(f'http://127.0.0.1:{server.server_port}/v1.1')
+
+    print(f"Benchmarking the Sensors of {DATASTREAMS} Datastreams ({RelationHandler.query_time * 1000:.0f} ms "
+          f"server query time)")
+    print("=" * 60)
+    datastreams = client.get_datastreams()
+    elapsed, requests = count_requests(lambda: [client.get_sensor(relations=ds).name for ds in datastreams])
+    print(f"{'one by one':15s}: {elapsed:7.1f} ms, {requests:3d} requests")
+    datastreams = client.get_datastreams(lazy_relations=True)
+    elapsed, requests = count_requests(lambda: [ds.sensor.name for ds in datastreams])
+    print(f"{'lazy relations':15s}: {elapsed:7.1f} ms, {requests:3d} requests")
+
+    # relations expanded by the query must neither be fetched again nor lose their expansions
+    _, requests = count_requests(lambda: [ds.observed_property.name for ds in datastreams])
+    lost = [ds.id for ds in datastreams if ds.thing.locations is None]
+    server.shutdown()
+    if requests > 0 or len(lost) > 0:
+        print(f"\nRegression: expanded relations sent {requests} requests, {len(lost)} Things lost their Locations")
+        sys.exit(1)
@@ -0,0 +1,44 @@
+"""Benchmark script to compare reloading observations from JSON with the memory-mapped store.py"""
+import json
+import tempfile
+import time
+import frost_sta_client
+from frosta.utils import as_time_series
+from frosta.store import ObservationStore
+from benchmark_http import create_mock_page
+
+
+def measure(function, iterations=5):
+    """Best wall time of function in ms"""
+    best = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def parse_pages(body):
+    """Decode a page and convert it like get_time_series does after the transfer"""
+    entity_list = frost_sta_client.utils.transform_json_to_entity_list(
+        json.loads(body), 'frost_sta_client.model.observation.Observation'
+    )
+    return as_time_series(entity_list)
+
+
+# Benchmark
+if __name__ == "__main__":
+    print("Benchmarking reload of a time series")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as path:
+        store = ObservationStore(path)
+        for size in [10000, 100000]:
+            body = create_mock_page(size)
+            series = parse_pages(body)
+            store.write(size, series)
+            parsed = measure(lambda: parse_pages(body), iterations=2)
+            full = measure(lambda: store.read(size).sum())
+            window = measure(lambda: store.read(size, '2024-01-01T01:00:00Z', '2024-01-01T02:00:00Z').sum())
+            print(f"{size:6d} observations: JSON {parsed:9.2f} ms, store {full:7.2f} ms, "
+                  f"one hour from store {window:5.2f} ms")
@@ -0,0 +1,80 @@
+"""Stress test of a FrostClient shared by many threads (thread_safe=True)"""
+import json
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import frost_sta_client as fsc
+from frosta import FrostClient
+
+LATENCY = 0.05  # simulated server time per request in seconds
+POOL_SIZE = 16
+REQUESTS = 320
+
+
+def create_mock_page(count=10):
+    """Create the JSON body of an Observations page as returned by FROST"""
+    value = [
+        {
+            '@iot.id': i,
+            'phenomenonTime': f'2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z',
+            'result': 20.0 + (i % 10) * 0.1,
+            'Datastream': {'@iot.id': 1}
+        }
+        for i in range(count)
+    ]
+    return json.dumps({'@iot.count': count, 'value': value}).encode('utf-8')
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Answers every query with the same page after a fixed latency"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = create_mock_page()
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Benchmark
+if __name__ == "__main__":
+    warnings.simplefilter('ignore', DeprecationWarning)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/v1.1'
+
+    client = FrostClient(url, thread_safe=True, pool_maxsize=POOL_SIZE)
+    datastream = fsc.Datastream(id=1)
+    progress = []
+
+    def fetch(_):
+        # per-call options instead of client.list_callback / client.step_size
+        return len(client.get_time_series(relations=datastream, callback=progress.append, step_size=5))
+
+    print(f"Throughput of one shared client (pool size {POOL_SIZE}, {LATENCY * 1000:.0f} ms latency)")
+    print("=" * 60)
+    baseline = None
+    for threads in [1, 2, 4, 8, 16]:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(fetch, range(threads)))  # warm-up
+            start = time.perf_counter()
+            rows = sum(executor.map(fetch, range(REQUESTS)))
+            elapsed = time.perf_counter() - start
+        throughput = REQUESTS / elapsed
+        baseline = baseline or throughput
+        print(f"{threads:3d} threads: {throughput:7.1f} requests/s, scaling {throughput / baseline:5.2f}x "
+              f"(ideal {threads}x), {rows} rows")
+
+    print(f"\nTransfer statistics: {client.transfer_stats}")
+    client.close()
+    server.shutdown()
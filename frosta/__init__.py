@@ -1,5 +1,34 @@
-from .frost_client import FrostClient
-from .utils import as_dataframe, as_time_series
-from .http_session import FrostHTTPSession, patch_frost_service_with_session
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['FrostClient', 'as_dataframe', 'as_time_series', 'FrostHTTPSession', 'patch_frost_service_with_session']
+# Submodules are imported on first access of their attributes, so that short-lived
+# scripts only pay for what they use (pandas and numpy are loaded by conversions only)
+_LAZY_IMPORTS = {
+    'FrostClient': 'frost_client',
+    'as_dataframe': 'utils',
+    'as_time_series': 'utils',
+    'iter_time_series': 'utils',
+    'ObservationStore': 'store',
+    'FrostHTTPSession': 'http_session',
+    'patch_frost_service_with_session': 'http_session',
+}
+
+if TYPE_CHECKING:
+    from .frost_client import FrostClient
+    from .utils import as_dataframe, as_time_series, iter_time_series
+    from .store import ObservationStore
+    from .http_session import FrostHTTPSession, patch_frost_service_with_session
+
+__all__ = ['FrostClient', 'as_dataframe', 'as_time_series', 'iter_time_series', 'ObservationStore', 'FrostHTTPSession', 'patch_frost_service_with_session']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module('.' + _LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
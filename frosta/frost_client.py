@@ -1,9 +1,15 @@
+from __future__ import annotations
 import frost_sta_client as fsc
-from .http_session import patch_frost_service_with_session, FrostHTTPSession
+import requests
+from furl import furl
+from .http_session import patch_frost_service_with_session, FrostHTTPSession, ResponseCache
 from .query_functions import get_entity_list
+from .relations import RelationResolver
+from .profiling import profiled
+from .provisioning import as_point, provision
 from geojson import Point
 from datetime import datetime, timezone
-import pytz
+from typing import TYPE_CHECKING
 from frost_sta_client.model.entity import Entity
 from frost_sta_client.model.location import Location
 from frost_sta_client.model.thing import Thing
@@ -14,11 +20,18 @@ from frost_sta_client.model.observation import Observation
 from frost_sta_client.model.ext.entity_list import EntityList
 from frost_sta_client.model.ext.unitofmeasurement import UnitOfMeasurement
 from frost_sta_client.utils import transform_entity_to_json_dict
-import pandas as pd
-from .utils import as_time_series
+from .utils import as_time_series, iter_time_series
 from dateutil.parser import isoparse
 import logging
 
+# pandas, numpy and pytz are only needed for annotations here and are imported
+# by the methods converting data, so that creating a client stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
+    import pytz
+    from .spatial import LocationIndex
+    from .store import ObservationStore
+
 class FrostClient():
 
     OBSERVATION_TYPES = {
@@ -29,7 +42,10 @@ class FrostClient():
         'OM_TruthObservation': 'http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_TruthObservation' # boolean
     }
 
-    def __init__(self, url: str='', username:str='', password: str='', use_session_pooling: bool=True):
+    def __init__(self, url: str='', username:str='', password: str='', use_session_pooling: bool=True,
+                 compression: bool | str=True, json_decoder='auto', thread_safe: bool=False,
+                 pool_maxsize: int=20, cache: bool=False, cache_ttl: float=0.0,
+                 cache_max_bytes: int=64 * 1024 * 1024):
         """
         Initialize FROST client.
         
@@ -38,16 +54,47 @@ class FrostClient():
             username: Authentication username
             password: Authentication password
             use_session_pooling: Enable HTTP connection pooling for better performance (default: True)
+            compression: Response compression negotiated by the pooled session (default: True)
+            json_decoder: JSON decoder for response bodies, 'auto' picks orjson or simdjson if installed
+            thread_safe: Share this client across threads. Instance state (list_callback,
+                step_size) is rejected in favour of per-call callback/step_size arguments and
+                threads wait for a free pooled connection instead of opening extra ones
+            pool_maxsize: Maximum number of pooled connections, i.e. concurrent requests
+            cache: Cache GET responses of the pooled session, revalidated by ETag/Last-Modified
+                if the server provides them (default: False)
+            cache_ttl: Seconds cached responses are reused without asking the server,
+                unless the server sends Cache-Control max-age
+            cache_max_bytes: Memory limit of the response cache, least recently used
+                responses are evicted first
         """
         auth_handler = fsc.AuthHandler(username, password)
         self.service = fsc.SensorThingsService(url, auth_handler)
+        self._thread_safe = thread_safe
         self.list_callback=None
         self.step_size=None
         self._http_session = None
+        self._relation_resolver = RelationResolver(self)
+        self._location_index = None
+        self._client_options = {
+            'use_session_pooling': use_session_pooling,
+            'compression': compression,
+            'json_decoder': json_decoder,
+            'pool_maxsize': pool_maxsize
+        }
         
         # Enable connection pooling by default for better performance
         if use_session_pooling:
-            self._http_session = patch_frost_service_with_session(self.service)
+            self._http_session = patch_frost_service_with_session(
+                self.service,
+                FrostHTTPSession(
+                    pool_maxsize=pool_maxsize,
+                    pool_block=thread_safe,
+                    compression=compression,
+                    json_decoder=json_decoder,
+                    cache=ResponseCache(ttl=cache_ttl, max_bytes=cache_max_bytes) if cache else None
+                )
+            )
+
     @property
     def service(self):
         return self._service
@@ -70,6 +117,8 @@ class FrostClient():
         if value is None:
             self._list_callback = value
             return
+        if self.thread_safe:
+            raise RuntimeError('Thread-safe clients take the callback as argument of each call!')
         if not callable(value):
             raise ValueError('Callback should be callable!')
         self._list_callback = value
@@ -80,20 +129,66 @@ class FrostClient():
 
     @step_size.setter
     def step_size(self, value):
+        if value is not None and self.thread_safe:
+            raise RuntimeError('Thread-safe clients take the step_size as argument of each call!')
         self._step_size = value
 
+    @property
+    def thread_safe(self) -> bool:
+        return self._thread_safe
+
+    @property
+    def transfer_stats(self) -> dict | None:
+        """Bytes on the wire versus decoded bytes of the pooled session."""
+        if self._http_session is None:
+            return None
+        return self._http_session.stats.as_dict()
+
+    @property
+    def cache_stats(self) -> dict | None:
+        """Hits, revalidations, misses and size of the response cache."""
+        if self._http_session is None or self._http_session.cache is None:
+            return None
+        return self._http_session.cache.as_dict()
+
+    def profile(self):
+        """
+        Context manager recording the phases of all calls in the current thread.
+
+        Usage:
+            with client.profile() as profile:
+                series = client.get_time_series(relations=datastream)
+            print(profile.table())
+
+        See frosta.profiling for the phases and export formats.
+        """
+        from .profiling import profile
+        return profile()
+
+    def clear_cache(self):
+        """Drop all cached responses, e.g. after another client changed the data."""
+        if self._http_session is not None and self._http_session.cache is not None:
+            self._http_session.cache.clear()
+
+    def _get_entity_list(self, entities, **kwargs) -> EntityList:
+        # per-call callback and step_size take precedence over the instance state
+        if kwargs.get('callback') is None:
+            kwargs['callback'] = self.list_callback
+        if kwargs.get('step_size') is None:
+            kwargs['step_size'] = self.step_size
+        return get_entity_list(entities, **kwargs)
+
     def single_entity(self, entity_list: EntityList) -> Entity | None:
         if len(entity_list.entities)>0:
             return entity_list.get(0)
         else:
             return None
 
+    @profiled
     def get_locations(self, id: str='', name: str='', description: str='', 
                       relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> EntityList:
-        return get_entity_list(
+        return self._get_entity_list(
             self.service.locations(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -101,12 +196,11 @@ class FrostClient():
             **kwargs
         )
     
+    @profiled
     def get_location(self, id: str='', name: str='', description: str='', 
                       relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> Location | None:
-        entity_list = get_entity_list(
+        entity_list = self._get_entity_list(
             self.service.locations(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -116,25 +210,42 @@ class FrostClient():
         )
         return self.single_entity(entity_list)
     
+    @profiled
+    def location_index(self, refresh: bool=False, **kwargs) -> LocationIndex:
+        """
+        Client-side spatial index over the Locations of the service.
+
+        The Locations are fetched once (filtered by kwargs, as for get_locations)
+        and cached; repeated bbox, radius, polygon and nearest queries then run
+        locally. Use refresh=True to rebuild the index from the server.
+        """
+        from .spatial import LocationIndex
+        if refresh or self._location_index is None:
+            self._location_index = LocationIndex(self.get_locations(**kwargs))
+        return self._location_index
+
+    @profiled
     def get_datastreams(self, id: str='', name: str='', description: str='', 
-                        relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> EntityList:
-        return get_entity_list(
+                        relations: Entity | EntityList | list[Entity] | None=None,
+                        lazy_relations: bool=False, **kwargs) -> EntityList:
+        entity_list = self._get_entity_list(
             self.service.datastreams(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
             relations=relations,
             **kwargs
         )
+        if lazy_relations:
+            self.attach_lazy_relations(entity_list)
+        return entity_list
 
+    @profiled
     def get_datastream(self, id: str='', name: str='', description: str='', 
-                        relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> Datastream | None:
-        entity_list = get_entity_list(
+                        relations: Entity | EntityList | list[Entity] | None=None,
+                        lazy_relations: bool=False, **kwargs) -> Datastream | None:
+        entity_list = self._get_entity_list(
             self.service.datastreams(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -142,14 +253,25 @@ class FrostClient():
             top=1,
             **kwargs
         )
+        if lazy_relations:
+            self.attach_lazy_relations(entity_list)
         return self.single_entity(entity_list)
     
+    def attach_lazy_relations(self, entities: Entity | EntityList | list[Entity]):
+        """
+        Replace the missing Thing, Sensor and ObservedProperty of Datastreams with lazy proxies.
+
+        Relations expanded by the query are kept. The first access of e.g. datastream.sensor fetches the Sensors of all
+        Datastreams with pending proxies in one batched query instead of one
+        query per Datastream. See frosta.relations for details.
+        """
+        return self._relation_resolver.attach(entities)
+
+    @profiled
     def get_observed_properties(self, id: str='', name: str='', description: str='', 
                                 relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> EntityList:
-        return get_entity_list(
+        return self._get_entity_list(
             self.service.observed_properties(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -157,12 +279,11 @@ class FrostClient():
             **kwargs
         )
 
+    @profiled
     def get_observed_property(self, id: str='', name: str='', description: str='', 
                                 relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> ObservedProperty | None:
-        entity_list = get_entity_list(
+        entity_list = self._get_entity_list(
             self.service.observed_properties(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -173,12 +294,11 @@ class FrostClient():
         return self.single_entity(entity_list)
     
 
+    @profiled
     def get_things(self, id: str='', name: str='', description: str='', 
                    relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> EntityList:
-        return get_entity_list(
+        return self._get_entity_list(
             self.service.things(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -186,12 +306,11 @@ class FrostClient():
             **kwargs
         )
 
+    @profiled
     def get_thing(self, id: str='', name: str='', description: str='', 
                    relations: Entity | EntityList | list[Entity] | None=None, **kwargs) -> Thing | None:
-        entity_list = get_entity_list(
+        entity_list = self._get_entity_list(
             self.service.things(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -201,24 +320,22 @@ class FrostClient():
         )
         return self.single_entity(entity_list)
 
+    @profiled
     def get_sensors(self, id: str='', name: str='', description: str='', 
                     relations: Entity | EntityList | list[Entity] | None=None , **kwargs) -> EntityList:
-        return get_entity_list(
+        return self._get_entity_list(
             self.service.sensors(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
             relations=relations,
             **kwargs
         )
+    @profiled
     def get_sensor(self, id: str='', name: str='', description: str='', 
                     relations: Entity | EntityList | list[Entity] | None=None , **kwargs) -> Sensor | None:
-        entity_list = get_entity_list(
+        entity_list = self._get_entity_list(
             self.service.sensors(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             id=id,
             name=name,
             description=description,
@@ -228,13 +345,12 @@ class FrostClient():
         )
         return self.single_entity(entity_list)
 
+    @profiled
     def get_observations(self, relations: Entity | EntityList | list[Entity] | None=None, 
                          start: str | datetime | None=None, end: str | datetime | None=None, 
                          lower_limit: float | None=None, upper_limit: float | None=None, **kwargs) -> EntityList:
-        return get_entity_list(
+        return self._get_entity_list(
             self.service.observations(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             relations=relations,
             start=start,
             end=end,
@@ -242,13 +358,12 @@ class FrostClient():
             upper_limit=upper_limit,
             **kwargs
         )
+    @profiled
     def get_observation(self, relations: Entity | EntityList | list[Entity] | None=None, 
                          start: str | datetime | None=None, end: str | datetime | None=None, 
                          lower_limit: float | None=None, upper_limit: float | None=None, **kwargs) -> Observation | None:
-        entity_list = get_entity_list(
+        entity_list = self._get_entity_list(
             self.service.observations(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             relations=relations,
             start=start,
             end=end,
@@ -259,14 +374,36 @@ class FrostClient():
         )
         return self.single_entity(entity_list)
     
+    @profiled
     def get_time_series(self, relations: Entity | EntityList | list[Entity] | None=None, 
                         start: str | datetime | None=None, end: str | datetime | None=None, 
                         lower_limit: float | None=None, upper_limit: float | None=None, 
-                        tz: str | pytz.tzinfo.BaseTzInfo | timezone ='UTC', **kwargs) -> pd.Series | None:
-        observations = get_entity_list(
+                        tz: str | pytz.tzinfo.BaseTzInfo | timezone ='UTC',
+                        store: ObservationStore | str | None=None, **kwargs) -> pd.Series | None:
+        """
+        Get the observations as pd.Series of results indexed by phenomenonTime.
+
+        With a store, only the time ranges of the datastream that are not stored
+        yet are fetched (for end=None: the observations since the last call).
+        Ranges are stored up to store.settle before the call at most, later
+        times are fetched again by every call. Observations uploaded with a
+        phenomenonTime in a stored range are not fetched.
+        The result is then a read-only, zero-copy view on the memory-mapped store,
+        see frosta.store.ObservationStore.
+
+        Args:
+            relations: Entities the observations belong to, a single Datastream if store is given
+            start: Start of the time range (inclusive)
+            end: End of the time range (exclusive)
+            lower_limit: Smallest result returned
+            upper_limit: Results from this value on are not returned
+            tz: Time zone of the returned index
+            store: ObservationStore (or its directory) to serve and persist the observations
+        """
+        if store is not None:
+            return self._get_stored_time_series(store, relations, start, end, lower_limit, upper_limit, tz, **kwargs)
+        observations = self._get_entity_list(
             self.service.observations(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             relations=relations,
             start=start,
             end=end,
@@ -276,14 +413,125 @@ class FrostClient():
         )
         return as_time_series(observations, tz=tz)
 
+    def _get_stored_time_series(self, store, relations, start, end, lower_limit, upper_limit, tz, **kwargs):
+        import numpy as np
+        from .store import ObservationStore, from_nanoseconds, to_nanoseconds, MIN_TIME
+        if isinstance(store, str):
+            store = ObservationStore(store)
+        if isinstance(relations, EntityList):
+            relations = relations.entities
+        if isinstance(relations, list) and len(relations) == 1:
+            relations = relations[0]
+        if not isinstance(relations, Datastream):
+            raise ValueError('Time series can only be stored for a single Datastream!')
+        unsupported = [key for key in kwargs.keys() if key not in ['callback', 'step_size']]
+        if len(unsupported) > 0:
+            raise ValueError(f"Stored time series do not support the query options {', '.join(unsupported)}!")
+
+        # times after now - settle can still receive observations: they are fetched
+        # but not marked as covered, so later calls fetch them again
+        now = to_nanoseconds(datetime.now(timezone.utc), 0)
+        settled = now - store.settle.value
+        start = to_nanoseconds(start, MIN_TIME)
+        end = to_nanoseconds(end, now)
+        for gap_start, gap_end in store.missing(relations.id, start, end):
+            observations = self._get_entity_list(
+                self.service.observations(),
+                relations=relations,
+                start=from_nanoseconds(gap_start),
+                end=from_nanoseconds(gap_end),
+                **kwargs
+            )
+            store.write(
+                relations.id,
+                as_time_series(observations),
+                start=gap_start,
+                end=min(gap_end, settled),
+                cover=gap_start < settled
+            )
+
+        series = store.read(relations.id, start, end, tz=tz)
+        if series is None or (lower_limit is None and upper_limit is None):
+            return series
+        # same semantics as the result filters of the query
+        valid = np.ones(len(series), dtype=bool)
+        if lower_limit is not None:
+            valid &= series.to_numpy() >= lower_limit
+        if upper_limit is not None:
+            valid &= series.to_numpy() < upper_limit
+        return series[valid] if valid.any() else None
+
+    def iter_time_series(self, relations: Entity | EntityList | list[Entity] | None=None,
+                         start: str | datetime | None=None, end: str | datetime | None=None,
+                         lower_limit: float | None=None, upper_limit: float | None=None,
+                         chunk_size: int=100000, tz: str | pytz.tzinfo.BaseTzInfo | timezone ='UTC', **kwargs):
+        """
+        Iterate over the time series in chunks instead of materialising it at once.
+
+        Takes the arguments of get_time_series and yields pd.Series of up to
+        chunk_size observations, for streaming consumers such as the
+        classes in frosta.timeseries.
+        """
+        observations = self._get_entity_list(
+            self.service.observations(),
+            relations=relations,
+            start=start,
+            end=end,
+            lower_limit=lower_limit,
+            upper_limit=upper_limit,
+            **kwargs
+        )
+        return iter_time_series(observations, chunk_size=chunk_size, tz=tz)
+
+    @profiled
+    def extract_time_series(self, datastreams: Datastream | EntityList | list[Datastream | int | str],
+                            start: str | datetime | None=None, end: str | datetime | None=None,
+                            windows: int=1, workers: int | None=None,
+                            tz: str | pytz.tzinfo.BaseTzInfo | timezone ='UTC', **kwargs) -> dict:
+        """
+        Extract the time series of many datastreams with a pool of worker processes.
+
+        Each datastream (and each of its time windows if windows > 1) is fetched
+        and decoded by a separate process, which sidesteps the GIL for very large
+        exports. See frosta.parallel for details.
+
+        Args:
+            datastreams: Datastreams or datastream ids to extract
+            start: Start of the time range (inclusive)
+            end: End of the time range (exclusive), required together with start if windows > 1
+            windows: Number of time windows each datastream is split into
+            workers: Number of worker processes (default: os.cpu_count())
+            tz: Time zone of the returned indices
+
+        Returns:
+            Dictionary mapping datastream ids to pd.Series (None if there are no observations)
+        """
+        from .parallel import extract_time_series
+        if isinstance(datastreams, (Entity, int, str)):
+            datastreams = [datastreams]
+        datastream_ids = [ds.id if isinstance(ds, Entity) else ds for ds in datastreams]
+        auth_handler = self.service.auth_handler
+        return extract_time_series(
+            self.service.url.url,
+            auth_handler.username if auth_handler is not None else '',
+            auth_handler.password if auth_handler is not None else '',
+            datastream_ids,
+            start=start,
+            end=end,
+            windows=windows,
+            workers=workers,
+            tz=tz,
+            client_options=self._client_options,
+            **kwargs
+        )
+
+    @profiled
     def get_observations_list(self, relations: Entity | EntityList | list[Entity] | None=None, 
                         start: str | datetime | None=None, end: str | datetime | None=None, 
                         lower_limit: float | None=None, upper_limit: float | None=None, 
                         tz: str | pytz.tzinfo.BaseTzInfo | timezone ='UTC', **kwargs) -> list[dict]:
-        observations = get_entity_list(
+        observations = self._get_entity_list(
             self.service.observations(),
-            callback=self.list_callback,
-            step_size=self.step_size,
             relations=relations,
             start=start,
             end=end,
@@ -297,13 +545,7 @@ class FrostClient():
                         properties: dict | None=None, location: Point | list[float] | dict | None=None, 
                         things=None, historical_locations=None, **kwargs) -> Location:
 
-        if not isinstance(location, Point):
-            if isinstance(location, tuple) or isinstance(location, list):
-                location = Point(tuple(location))
-            elif isinstance(location, dict):
-                location = Point((location.get('x'), location.get('y')))
-            else:
-                raise TypeError("location must be a geojson Point, tuple, list, or dict with keys 'x' and 'y'")
+        location = as_point(location)
     
         if encoding_type == '':
             encoding_type = 'application/vnd.geo+json'
@@ -438,13 +680,125 @@ class FrostClient():
             )
         )
 
+    @profiled
+    def upsert_time_series(self, datastream: Datastream, series: pd.Series, update: bool=False,
+                           batch_size: int=1000) -> dict:
+        """
+        Upload the points of a time series that the datastream does not contain yet.
+
+        Only the phenomenonTimes (and, with update=True, ids and results) within the
+        range of the series are fetched. New points are found by comparing the
+        indices and created in batches with the dataArray extension
+        (CreateObservations), so repeated uploads of the same file cost one query.
+
+        Args:
+            datastream: Datastream to upload to
+            series: Results indexed by phenomenonTime, naive times are taken as UTC
+            update: Patch the result of existing observations whose value differs
+            batch_size: Maximum number of observations per CreateObservations request
+
+        Returns:
+            Dictionary with the number of created, updated and unchanged observations
+        """
+        import pandas as pd
+        summary = {'created': 0, 'updated': 0, 'unchanged': 0}
+        # JSON cannot represent NaN results
+        series = series.dropna()
+        if series.empty:
+            return summary
+        index = pd.DatetimeIndex(series.index)
+        index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+        series = pd.Series(series.values, index=index).sort_index()
+        series = series[~series.index.duplicated(keep='last')]
+        index = series.index
+
+        existing = self._get_entity_list(
+            self.service.observations(),
+            relations=datastream,
+            start=index[0],
+            end=index[-1] + pd.Timedelta(milliseconds=1),
+            select=['@iot.id', 'phenomenonTime', 'result'] if update else ['phenomenonTime'],
+            expand=''
+        )
+        ids, times, results = [], [], []
+        for obs in existing:
+            ids.append(obs.id)
+            times.append(obs.phenomenon_time)
+            results.append(obs.result)
+        existing_index = pd.to_datetime(times, utc=True, format='ISO8601')
+        missing = ~index.isin(existing_index)
+
+        if missing.any():
+            summary['created'] = self._create_observations(datastream, series[missing], batch_size)
+        if update and not missing.all():
+            present = series[~missing]
+            keep = ~existing_index.duplicated(keep='first')
+            old = pd.Series(results, index=existing_index)[keep].reindex(present.index)
+            old_ids = pd.Series(ids, index=existing_index)[keep].reindex(present.index)
+            changed = present.values != old.values
+            for id, value in zip(old_ids[changed].tolist(), present[changed].tolist()):
+                self.service.patch(fsc.Observation(id=id), [{'op': 'replace', 'path': '/result', 'value': value}])
+            summary['updated'] = int(changed.sum())
+        summary['unchanged'] = len(series) - summary['created'] - summary['updated']
+        return summary
+
+    def _create_observations(self, datastream: Datastream, series: pd.Series, batch_size: int) -> int:
+        url = furl(self.service.url)
+        url.path.add('CreateObservations')
+        times = series.index.strftime('%Y-%m-%dT%H:%M:%S.%fZ').tolist()
+        values = series.tolist()
+        for i in range(0, len(values), batch_size):
+            data_array = [list(point) for point in zip(times[i:i + batch_size], values[i:i + batch_size])]
+            try:
+                response = self.service.execute('post', url, json=[{
+                    'Datastream': {'@iot.id': datastream.id},
+                    'components': ['phenomenonTime', 'result'],
+                    'dataArray@iot.count': len(data_array),
+                    'dataArray': data_array
+                }])
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in [404, 405, 501] or i > 0:
+                    raise
+                # server without dataArray extension, create one by one
+                logging.info('CreateObservations not supported, creating observations individually')
+                for time, value in zip(times, values):
+                    self.create_observation(phenomenon_time=time, result=value, datastream=datastream)
+                return len(values)
+            failed = [location for location in response.json() if location == 'error']
+            if len(failed) > 0:
+                raise ValueError(f'Server failed to create {len(failed)} of {len(data_array)} observations')
+        return len(values)
+
+    @profiled
+    def provision(self, things: list[dict], batch_size: int=100, use_batch: bool=True) -> EntityList:
+        """
+        Create many Things with their Locations, Datastreams, Sensors and ObservedProperties.
+
+        Shared Sensors and ObservedProperties are matched by name against existing
+        ones and created once; every Thing is then created by deep insert, with up
+        to batch_size Things per JSON $batch request. See frosta.provisioning for
+        the format of the description.
+
+        Args:
+            things: List of dictionaries describing the Things
+            batch_size: Number of entities per $batch request
+            use_batch: Combine requests into $batch requests (default: True)
+
+        Returns:
+            EntityList of the created Things, expanded with Locations and Datastreams
+        """
+        return provision(self, things, batch_size=batch_size, use_batch=use_batch)
+
+    @profiled
     def create(self, entity):
         self.service.create(entity)
         return entity
 
+    @profiled
     def update(self, entity):
         self.service.update(entity)
 
+    @profiled
     def delete(self, entity):
         if isinstance(entity, EntityList):
             for e in entity:
@@ -456,6 +810,8 @@ class FrostClient():
         return transform_entity_to_json_dict(entity)
 
     def change_datastream_id(self, datastream, new_id):
+        ## relations missing on the datastream are resolved in batched queries
+        self.attach_lazy_relations(datastream)
         ## create new datastream as copy with new id
         new_datastream = self.create_datastream(
             id=new_id,
@@ -464,12 +820,9 @@ class FrostClient():
             observation_type=datastream.observation_type,
             unit_of_measurement=datastream.unit_of_measurement,
             properties=datastream.properties,
-            thing=datastream.thing\
-                if datastream.thing is not None else self.get_things(relations=datastream).get(0),
-            sensor=datastream.sensor\
-                if datastream.sensor is not None else self.get_sensors(relations=datastream).get(0),
-            observed_property=datastream.observed_property\
-                if datastream.observed_property is not None else self.get_observed_properties(relations=datastream).get(0)
+            thing=datastream.thing,
+            sensor=datastream.sensor,
+            observed_property=datastream.observed_property
         )
         ## link observations to new datastream
         observations = self.get_observations(relations=datastream)
@@ -477,6 +830,7 @@ class FrostClient():
             obs.datastream = new_datastream
             self.update(obs)
         ## delete old datastream
+        self.delete(datastream)
 
     def close(self):
         """Close HTTP session and clean up resources."""
@@ -489,4 +843,4 @@ class FrostClient():
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
-        self.delete(datastream)
+
@@ -2,20 +2,304 @@
 HTTP session optimization for FROST client.
 
 Provides connection pooling and reuse to reduce overhead of establishing
-new connections for each request to the FROST server.
+new connections for each request to the FROST server, negotiates response
+compression, decodes JSON bodies with the fastest available parser and
+optionally caches GET responses (see ResponseCache).
 """
+import json
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
 import requests
+from requests.structures import CaseInsensitiveDict
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
 import logging
+from . import profiling
 
 logger = logging.getLogger(__name__)
 
+# Fast JSON decoders in order of preference for json_decoder='auto'
+JSON_DECODERS = ['orjson', 'simdjson', 'json']
+
+
+def get_json_decoder(name='auto'):
+    """
+    Resolve a JSON decoder by name, falling back to the standard library.
+
+    Args:
+        name: 'auto', 'orjson', 'simdjson', 'json' or a callable taking bytes
+
+    Returns:
+        Tuple of (decoder name, callable decoding bytes into Python objects)
+    """
+    if callable(name):
+        return getattr(name, '__name__', 'custom'), name
+    candidates = JSON_DECODERS if name == 'auto' else [name, 'json']
+    for candidate in candidates:
+        if candidate == 'orjson':
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return candidate, orjson.loads
+        if candidate == 'simdjson':
+            try:
+                import simdjson
+            except ImportError:
+                continue
+            return candidate, simdjson.loads
+        if candidate == 'json':
+            return candidate, json.loads
+        raise ValueError(f'Unknown JSON decoder: {candidate}')
+    return 'json', json.loads
+
+
+def wire_bytes(response):
+    """Bytes of a fully read response body as transferred, i.e. before decompression."""
+    decoded = len(response.content or b'')
+    try:
+        return response.raw.tell() or decoded
+    except (AttributeError, ValueError):
+        return decoded
+
+
+class TransferStats:
+    """Counts requests and compares bytes on the wire with decoded body size."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.wire_bytes = 0
+            self.decoded_bytes = 0
+            self.encodings = {}
+
+    def record(self, response):
+        """Add the transfer size of a fully read response."""
+        decoded = len(response.content or b'')
+        wire = wire_bytes(response)
+        encoding = response.headers.get('Content-Encoding', 'identity')
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire
+            self.decoded_bytes += decoded
+            self.encodings[encoding] = self.encodings.get(encoding, 0) + 1
+
+    @property
+    def compression_ratio(self):
+        """Decoded bytes per byte transferred (1.0 without compression)."""
+        if self.wire_bytes == 0:
+            return 1.0
+        return self.decoded_bytes / self.wire_bytes
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'wire_bytes': self.wire_bytes,
+                'decoded_bytes': self.decoded_bytes,
+                'compression_ratio': self.compression_ratio,
+                'encodings': dict(self.encodings)
+            }
+
+
+def normalize_url(url):
+    """
+    Normalise a request URL for use as cache key.
+
+    Scheme and host are lower-cased, default ports dropped and the query
+    parameters sorted and encoded consistently, so that equivalent queries
+    built in different order share one cache entry.
+    """
+    parts = urlsplit(str(url))
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), quote_via=quote, safe="$()',/:@")
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+class CacheEntry:
+    """Body and headers of a cached response with its expiry and validators."""
+    __slots__ = ('url', 'headers', 'content', 'encoding', 'expires', 'size')
+
+    def __init__(self, response, expires):
+        self.url = response.url
+        self.headers = CaseInsensitiveDict(response.headers)
+        self.content = response.content or b''
+        self.encoding = response.encoding
+        self.expires = expires
+        self.size = len(self.content) + sum(len(k) + len(v) for k, v in self.headers.items()) + len(self.url)
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified')
+
+    def response(self):
+        """A new requests.Response with the cached body."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response._content = self.content
+        response.from_cache = True
+        return response
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of GET responses keyed on the normalised URL.
+
+    Entries are fresh for max-age seconds if the server (or a caching proxy)
+    sends Cache-Control, else for ttl seconds. Stale entries with an ETag or
+    Last-Modified header are revalidated with a conditional request, so an
+    unchanged resource costs a 304 without body. Entries without validators
+    are only stored if ttl > 0. The least recently used entries are evicted
+    once the cached bodies and headers exceed max_bytes.
+    """
+
+    def __init__(self, ttl=0.0, max_bytes=64 * 1024 * 1024, max_entries=None):
+        """
+        Args:
+            ttl: Seconds a response is served without revalidation if the server sends no max-age
+            max_bytes: Memory limit of the cached bodies and headers
+            max_entries: Maximum number of cached responses (default: unlimited)
+        """
+        if ttl < 0:
+            raise ValueError('ttl must not be negative!')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the entry for key (fresh or stale) and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry):
+        return time.monotonic() < entry.expires
+
+    def store(self, key, response):
+        """Store a 200 response if its headers allow it, return whether it was stored."""
+        if response.status_code != 200:
+            return False
+        expires = self._expires(response.headers)
+        has_validators = 'ETag' in response.headers or 'Last-Modified' in response.headers
+        if expires is None or (expires <= time.monotonic() and not has_validators):
+            return False
+        return self._put(key, CacheEntry(response, expires))
+
+    def refresh(self, entry, response):
+        """Update a stale entry after a 304 Not Modified response."""
+        with self._lock:
+            for header in ['ETag', 'Last-Modified', 'Cache-Control', 'Date']:
+                if header in response.headers:
+                    entry.headers[header] = response.headers[header]
+            expires = self._expires(entry.headers)
+            entry.expires = expires if expires is not None else time.monotonic()
+            self.revalidated += 1
+
+    def _expires(self, headers):
+        """Monotonic expiry time of a response, None if it must not be stored."""
+        cache_control = [d.strip().lower() for d in headers.get('Cache-Control', '').split(',') if d.strip()]
+        if 'no-store' in cache_control:
+            return None
+        now = time.monotonic()
+        if 'no-cache' in cache_control:
+            return now
+        for directive in cache_control:
+            if directive.startswith('max-age='):
+                try:
+                    return now + max(int(directive.split('=', 1)[1]) - int(headers.get('Age', 0)), 0)
+                except ValueError:
+                    break
+        return now + self.ttl
+
+    def _put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes or (self.max_entries is not None and len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+        return True
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        """Drop all entries, e.g. after writes that may change cached query results."""
+        with self._lock:
+            if len(self._entries) > 0:
+                self.invalidations += 1
+            self._entries.clear()
+            self.size = 0
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
 
 class FrostHTTPSession:
-    """Manages HTTP session with connection pooling for FROST API calls."""
+    """
+    Manages HTTP session with connection pooling for FROST API calls.
+
+    A single session can be shared by many threads: urllib3 hands each thread
+    its own connection from the pool and transfer statistics are updated
+    under a lock. With pool_block=True, threads beyond pool_maxsize wait for a
+    free connection instead of opening (and discarding) extra ones.
+    """
     
-    def __init__(self, pool_connections=10, pool_maxsize=20, max_retries=3):
+    def __init__(self, pool_connections=10, pool_maxsize=20, max_retries=3,
+                 compression=True, json_decoder='auto', pool_block=False, cache=None):
         """
         Initialize HTTP session with connection pooling.
         
@@ -23,8 +307,24 @@ class FrostHTTPSession:
             pool_connections: Number of connection pools to cache
             pool_maxsize: Maximum number of connections to save in the pool
             max_retries: Maximum number of retries for failed requests
+            compression: True to accept every encoding urllib3 can decode
+                (gzip, deflate and br/zstd if brotli/zstandard are installed),
+                False to request uncompressed bodies, or an Accept-Encoding string
+            json_decoder: Decoder for response bodies, see get_json_decoder()
+            pool_block: Block when all pooled connections are in use
+            cache: ResponseCache for GET requests, True for a default one, or None to disable caching
         """
         self.session = requests.Session()
+        if compression is True:
+            self.accept_encoding = ACCEPT_ENCODING
+        elif compression is False or compression is None:
+            self.accept_encoding = 'identity'
+        else:
+            self.accept_encoding = compression
+        self.session.headers['Accept-Encoding'] = self.accept_encoding
+        self.json_decoder, self._json_loads = get_json_decoder(json_decoder)
+        self.stats = TransferStats()
+        self.cache = ResponseCache() if cache is True else (cache if cache is not False else None)
         
         # Configure retry strategy
         retry_strategy = Retry(
@@ -38,38 +338,106 @@ class FrostHTTPSession:
         adapter = HTTPAdapter(
             pool_connections=pool_connections,
             pool_maxsize=pool_maxsize,
-            max_retries=retry_strategy
+            max_retries=retry_strategy,
+            pool_block=pool_block
         )
         
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
         logger.debug(f"HTTP session initialized: pool_connections={pool_connections}, "
-                    f"pool_maxsize={pool_maxsize}, max_retries={max_retries}")
+                    f"pool_maxsize={pool_maxsize}, max_retries={max_retries}, "
+                    f"accept_encoding={self.accept_encoding}, json_decoder={self.json_decoder}")
     
     def get(self, url, **kwargs):
         """Execute GET request using pooled connection."""
-        return self.session.get(url, **kwargs)
+        return self.request('GET', url, **kwargs)
     
     def post(self, url, **kwargs):
         """Execute POST request using pooled connection."""
-        return self.session.post(url, **kwargs)
+        return self.request('POST', url, **kwargs)
     
     def patch(self, url, **kwargs):
         """Execute PATCH request using pooled connection."""
-        return self.session.patch(url, **kwargs)
+        return self.request('PATCH', url, **kwargs)
     
     def put(self, url, **kwargs):
         """Execute PUT request using pooled connection."""
-        return self.session.put(url, **kwargs)
+        return self.request('PUT', url, **kwargs)
     
     def delete(self, url, **kwargs):
         """Execute DELETE request using pooled connection."""
-        return self.session.delete(url, **kwargs)
+        return self.request('DELETE', url, **kwargs)
     
     def request(self, method, url, **kwargs):
         """Execute arbitrary HTTP request using pooled connection."""
-        return self.session.request(method, url, **kwargs)
+        if self.cache is not None and not kwargs.get('stream', False):
+            if method.upper() == 'GET':
+                return self._cached_get(url, **kwargs)
+            if method.upper() not in ['HEAD', 'OPTIONS']:
+                self.cache.clear()
+        response = self.session.request(method, url, **kwargs)
+        if not kwargs.get('stream', False):
+            self.stats.record(response)
+            self._attach_json_decoder(response)
+        return response
+
+    def _cached_get(self, url, **kwargs):
+        """Serve a GET request from the cache, revalidating stale entries."""
+        # responses may differ per user, so the credentials are part of the key
+        auth = kwargs.get('auth')
+        key = (normalize_url(url), getattr(auth, 'username', None))
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record(hit=True)
+            return self._from_entry(entry)
+
+        if entry is not None and (entry.etag is not None or entry.last_modified is not None):
+            headers = dict(kwargs.pop('headers', None) or {})
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+            kwargs['headers'] = headers
+        response = self.session.request('GET', url, **kwargs)
+        self.stats.record(response)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(entry, response)
+            return self._from_entry(entry)
+
+        self.cache.record(hit=False)
+        self.cache.store(key, response)
+        self._attach_json_decoder(response)
+        return response
+
+    def _from_entry(self, entry):
+        response = entry.response()
+        self._attach_json_decoder(response)
+        return response
+
+    def _attach_json_decoder(self, response):
+        """
+        Replace response.json() with the configured fast decoder.
+
+        Falls back to the standard requests implementation for keyword
+        arguments or bodies the fast decoder rejects, so error handling
+        (requests' JSONDecodeError) stays the same for callers.
+        """
+        if self.json_decoder == 'json' and profiling.active() is None:
+            return
+        loads = self._json_loads
+        standard_json = response.json
+
+        def fast_json(**kwargs):
+            with profiling.phase('decode', bytes=len(response.content or b'')):
+                if kwargs or self.json_decoder == 'json':
+                    return standard_json(**kwargs)
+                try:
+                    return loads(response.content)
+                except (ValueError, TypeError):
+                    return standard_json()
+
+        response.json = fast_json
     
     def close(self):
         """Close the session and clean up connections."""
@@ -88,7 +456,8 @@ def patch_frost_service_with_session(frost_service, session=None):
     Monkey-patch a frost_sta_client.SensorThingsService to use a shared HTTP session.
     
     This significantly improves performance by reusing connections instead of
-    creating new ones for each request.
+    creating new ones for each request. The replacement execute keeps no state
+    of its own, so the patched service can be shared by many threads.
     
     Args:
         frost_service: Instance of frost_sta_client.service.SensorThingsService
@@ -105,21 +474,27 @@ def patch_frost_service_with_session(frost_service, session=None):
     
     # Create wrapper that uses session
     def execute_with_session(method, url, **kwargs):
-        if frost_service.auth_handler is not None:
-            return session.request(
-                method, 
-                url, 
-                proxies=frost_service.proxies, 
-                auth=frost_service.auth_handler.add_auth_header(), 
-                **kwargs
-            )
-        else:
-            return session.request(
-                method, 
-                url, 
-                proxies=frost_service.proxies, 
-                **kwargs
-            )
+        with profiling.phase('http') as span:
+            if frost_service.auth_handler is not None:
+                response = session.request(
+                    method, 
+                    url, 
+                    proxies=frost_service.proxies, 
+                    auth=frost_service.auth_handler.add_auth_header(), 
+                    **kwargs
+                )
+            else:
+                response = session.request(
+                    method, 
+                    url, 
+                    proxies=frost_service.proxies, 
+                    **kwargs
+                )
+            if span is not None:
+                span.add(bytes=0 if getattr(response, 'from_cache', False) else wire_bytes(response))
+        # like the original execute, report failed requests as HTTPError
+        response.raise_for_status()
+        return response
     
     # Replace execute method
     frost_service.execute = execute_with_session
@@ -0,0 +1,217 @@
+"""
+Multiprocess extraction of observations for FROST client.
+
+Decoding JSON pages and converting them to time series is CPU-bound, so a
+single process cannot saturate the connection pool on very large pulls.
+Extraction is split into tasks (one per datastream and time window) that
+worker processes fetch and decode independently. Workers hand the decoded
+int64 time and numeric result arrays back through shared memory, so the
+parent only copies raw buffers instead of unpickling whole DataFrames.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+import os
+import logging
+import numpy as np
+import pandas as pd
+import frost_sta_client as fsc
+
+logger = logging.getLogger(__name__)
+
+# Client of the current worker process, created once by _init_worker
+_worker_client = None
+
+
+def _init_worker(url, username, password, client_options):
+    global _worker_client
+    from .frost_client import FrostClient
+    _worker_client = FrostClient(url=url, username=username, password=password, **client_options)
+
+
+def _to_shared_memory(array):
+    """Copy an array into a new shared memory block and return its name."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    # ownership passes to the parent, which unlinks the block after copying
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    shm.close()
+    return shm.name
+
+
+def _from_shared_memory(name, length, dtype, out):
+    """Copy a shared memory block into out and release the block."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out[:] = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _release(chunk):
+    for key in ['time', 'result']:
+        name = chunk.get(key)
+        if name is None:
+            continue
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+
+
+def _extract(task):
+    """Fetch and decode the observations of one datastream and time window."""
+    datastream_id, start, end, query_options = task
+    observations = _worker_client.get_observations(
+        relations=fsc.Datastream(id=datastream_id),
+        start=start,
+        end=end,
+        select=['phenomenonTime', 'result'],
+        **query_options
+    )
+    times = []
+    results = []
+    for obs in observations:
+        times.append(obs.phenomenon_time)
+        results.append(obs.result)
+
+    chunk = {'datastream': datastream_id, 'length': len(times), 'time': None, 'result': None, 'dtype': None,
+             'values': None}
+    if len(times) == 0:
+        return chunk
+    index = pd.to_datetime(times, utc=True, format='ISO8601').as_unit('ns')
+    values = None
+    # only int and float results are shared as a buffer (int64 or float64, like
+    # the serial conversion infers them); bools, strings, None and objects
+    # (e.g. OM_Observation) are pickled as list to keep their type
+    if all(type(result) in (int, float) for result in results):
+        values = np.asarray(results)
+        if values.dtype.kind not in 'if':
+            values = None
+    if values is None:
+        chunk['values'] = results
+    else:
+        chunk['dtype'] = values.dtype.str
+    chunk['time'] = _to_shared_memory(index.asi8)
+    try:
+        if values is not None:
+            chunk['result'] = _to_shared_memory(values)
+    except BaseException:
+        _release(chunk)
+        raise
+    return chunk
+
+
+def split_time_range(start, end, windows):
+    """Split [start, end) into equally long windows, returned as ISO strings."""
+    if windows <= 1:
+        return [(start, end)]
+    if start is None or end is None:
+        raise ValueError('start and end are required to split an extraction into time windows')
+    bounds = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), periods=windows + 1)
+    bounds = [bound.isoformat() for bound in bounds]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def extract_time_series(url, username, password, datastream_ids, start=None, end=None, windows=1,
+                        workers=None, tz='UTC', client_options=None, **query_options):
+    """
+    Extract time series of many datastreams using a pool of worker processes.
+
+    Args:
+        url: FROST server URL
+        username: Authentication username
+        password: Authentication password
+        datastream_ids: Ids of the datastreams to extract
+        start: Start of the time range (inclusive)
+        end: End of the time range (exclusive)
+        windows: Number of time windows each datastream is split into
+        workers: Number of worker processes (default: os.cpu_count())
+        tz: Time zone of the returned indices
+        client_options: Keyword arguments for the FrostClient of each worker
+        **query_options: Further filters passed to get_observations (e.g. lower_limit)
+
+    Returns:
+        Dictionary mapping datastream ids to pd.Series (None if there are no observations)
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if client_options is None:
+        client_options = {}
+    tasks = [
+        (datastream_id, window_start, window_end, query_options)
+        for datastream_id in datastream_ids
+        for window_start, window_end in split_time_range(start, end, windows)
+    ]
+    logger.debug(f"Extracting {len(tasks)} tasks with {workers} worker processes")
+
+    futures = []
+    chunks = []
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(url, username, password, client_options)
+    )
+    try:
+        futures = [executor.submit(_extract, task) for task in tasks]
+        # results are consumed in submission order, so windows stay sorted
+        for future in futures:
+            chunks.append(future.result())
+        return _assemble(datastream_ids, chunks, tz)
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                _release(future.result())
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+
+def _assemble(datastream_ids, chunks, tz):
+    """Concatenate the chunks of each datastream into a single pd.Series."""
+    series = {}
+    for datastream_id in datastream_ids:
+        parts = [chunk for chunk in chunks if chunk['datastream'] == datastream_id]
+        length = sum(chunk['length'] for chunk in parts)
+        if length == 0:
+            series[datastream_id] = None
+            continue
+        times = np.empty(length, dtype='int64')
+        numeric = all(chunk['values'] is None for chunk in parts)
+        if numeric:
+            # int64 chunks are promoted to float64 if other chunks have floats
+            dtype = np.result_type(*[chunk['dtype'] for chunk in parts if chunk['length'] > 0])
+            values = np.empty(length, dtype=dtype)
+        else:
+            values = []
+        offset = 0
+        for chunk in parts:
+            n = chunk['length']
+            if n == 0:
+                continue
+            _from_shared_memory(chunk['time'], n, 'int64', times[offset:offset + n])
+            chunk['time'] = None
+            if numeric:
+                _from_shared_memory(chunk['result'], n, chunk['dtype'], values[offset:offset + n])
+                chunk['result'] = None
+            elif chunk['values'] is not None:
+                values.extend(chunk['values'])
+            else:
+                buffer = np.empty(n, dtype=chunk['dtype'])
+                _from_shared_memory(chunk['result'], n, chunk['dtype'], buffer)
+                chunk['result'] = None
+                values.extend(buffer.tolist())
+            offset += n
+        index = pd.to_datetime(times, unit='ns', utc=True)
+        if tz != 'UTC':
+            index = index.tz_convert(tz)
+        series[datastream_id] = pd.Series(data=values, index=index, name=datastream_id)
+    return series
@@ -0,0 +1,249 @@
+"""
+Per-phase profiling of FrostClient calls.
+
+Inside `with client.profile() as profile:`, every FrostClient call of the
+current thread records a tree of phases with wall time, CPU time (of the
+thread) and counters:
+
+    build_query   filters, time parsing and expansion of the query
+    http          request incl. waiting for the server (bytes on the wire)
+    decode        JSON decoding of the body (decoded bytes)
+    entities      frost_sta_client entity construction (pages, rows)
+    iterate       iteration over an EntityList, fetching further pages
+    to_datetime   timestamp parsing of as_time_series/as_dataframe
+    convert       construction of the pandas objects (rows)
+
+The profile can be printed as table, or exported as Chrome trace
+(chrome://tracing, Perfetto, speedscope) or collapsed stacks for
+flamegraph.pl. Phases outside a profile cost one thread-local lookup.
+"""
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+import frost_sta_client
+
+_local = threading.local()
+_hook_lock = threading.Lock()
+# Active profiles of all threads and the original function while the hook is installed
+_hook_users = 0
+_hook_original = None
+
+COUNTERS = ['pages', 'rows', 'bytes']
+
+
+def active():
+    """The Profile recording in the current thread, or None."""
+    return getattr(_local, 'profile', None)
+
+
+class Span:
+    """One execution of a phase with its child phases."""
+    __slots__ = ('name', 'children', 'start', 'wall', 'cpu', 'counters', 'thread')
+
+    def __init__(self, name):
+        self.name = name
+        self.children = []
+        self.start = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.counters = {}
+        self.thread = threading.get_ident()
+
+    def add(self, **counters):
+        """Add to the counters (pages, rows, bytes) of the phase."""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @property
+    def self_wall(self):
+        return self.wall - sum(child.wall for child in self.children)
+
+    @property
+    def self_cpu(self):
+        return self.cpu - sum(child.cpu for child in self.children)
+
+
+class Profile:
+    """Phases recorded by FrostClient calls within client.profile()."""
+
+    def __init__(self):
+        self.calls = []
+        self._stack = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name, **counters):
+        span = Span(name)
+        span.add(**counters)
+        (self._stack[-1].children if len(self._stack) > 0 else self.calls).append(span)
+        self._stack.append(span)
+        span.start = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield span
+        finally:
+            span.wall = time.perf_counter() - span.start
+            span.cpu = time.thread_time() - cpu
+            self._stack.pop()
+
+    def current(self):
+        return self._stack[-1] if len(self._stack) > 0 else None
+
+    def _walk(self, spans=None, path=()):
+        for span in self.calls if spans is None else spans:
+            yield path + (span.name,), span
+            yield from self._walk(span.children, path + (span.name,))
+
+    def as_records(self) -> list[dict]:
+        """
+        Phases aggregated by their path, in order of first occurrence.
+
+        Returns:
+            List of dictionaries with path, phase, depth, calls, wall, self_wall,
+            cpu and self_cpu (seconds) and the counters pages, rows and bytes
+        """
+        records = {}
+        for path, span in self._walk():
+            record = records.get(path)
+            if record is None:
+                record = records[path] = {
+                    'path': '/'.join(path), 'phase': span.name, 'depth': len(path) - 1, 'calls': 0,
+                    'wall': 0.0, 'self_wall': 0.0, 'cpu': 0.0, 'self_cpu': 0.0,
+                    **{counter: 0 for counter in COUNTERS}
+                }
+            record['calls'] += 1
+            record['wall'] += span.wall
+            record['self_wall'] += span.self_wall
+            record['cpu'] += span.cpu
+            record['self_cpu'] += span.self_cpu
+            for counter in COUNTERS:
+                record[counter] += span.counters.get(counter, 0)
+        return list(records.values())
+
+    def table(self) -> str:
+        """The aggregated phases as text table (times in ms)."""
+        header = f"{'phase':32s} {'calls':>6s} {'wall':>10s} {'self':>10s} {'cpu':>10s} " \
+                 f"{'pages':>6s} {'rows':>9s} {'bytes':>12s}"
+        lines = [header, '-' * len(header)]
+        for record in self.as_records():
+            name = '  ' * record['depth'] + record['phase']
+            lines.append(
+                f"{name:32s} {record['calls']:6d} {record['wall'] * 1000:10.2f} {record['self_wall'] * 1000:10.2f} "
+                f"{record['cpu'] * 1000:10.2f} {record['pages']:6d} {record['rows']:9d} {record['bytes']:12d}"
+            )
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.table()
+
+    def chrome_trace(self) -> dict:
+        """The phases as Chrome trace events (complete events, times in µs)."""
+        events = []
+        for _, span in self._walk():
+            events.append({
+                'name': span.name,
+                'cat': 'frosta',
+                'ph': 'X',
+                'ts': (span.start - self._origin) * 1e6,
+                'dur': span.wall * 1e6,
+                'pid': os.getpid(),
+                'tid': span.thread,
+                'args': {'cpu_ms': span.cpu * 1000, **span.counters}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        """Write the Chrome trace to a JSON file."""
+        with open(path, 'w') as file:
+            json.dump(self.chrome_trace(), file)
+
+    def collapsed(self) -> str:
+        """The self wall time of each phase in µs as collapsed stacks for flamegraph.pl."""
+        stacks = {}
+        for path, span in self._walk():
+            key = ';'.join(path)
+            stacks[key] = stacks.get(key, 0) + span.self_wall
+        return '\n'.join(f'{key} {round(value * 1e6)}' for key, value in stacks.items())
+
+
+@contextmanager
+def profile():
+    """Record the phases of all FrostClient calls of the current thread."""
+    _install_entity_hook()
+    previous = active()
+    _local.profile = Profile()
+    try:
+        yield _local.profile
+    finally:
+        _local.profile = previous
+        _remove_entity_hook()
+
+
+@contextmanager
+def phase(name, **counters):
+    """Record a phase in the active profile of the thread, if any."""
+    current = active()
+    if current is None:
+        yield None
+        return
+    with current.phase(name, **counters) as span:
+        yield span
+
+
+def profiled(function):
+    """Record each call of a FrostClient method as top-level phase."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        current = active()
+        if current is None:
+            return function(*args, **kwargs)
+        with current.phase(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def _install_entity_hook():
+    """
+    Time the entity construction of frost_sta_client while a profile is active.
+
+    Query.list and EntityList look up transform_json_to_entity_list in
+    frost_sta_client.utils on each page, so wrapping it there times every
+    page. Nested calls (expanded relations) are part of the outer phase.
+    The wrapper is shared by the profiles of all threads and removed by
+    _remove_entity_hook when the last of them ends.
+    """
+    global _hook_users, _hook_original
+    with _hook_lock:
+        _hook_users += 1
+        if _hook_users > 1:
+            return
+        transform = _hook_original = frost_sta_client.utils.transform_json_to_entity_list
+
+        @functools.wraps(transform)
+        def profiled_transform(json_response, entity_class):
+            current = active()
+            if current is None or (current.current() is not None and current.current().name == 'entities'):
+                return transform(json_response, entity_class)
+            with current.phase('entities', pages=1) as span:
+                entity_list = transform(json_response, entity_class)
+                span.add(rows=len(entity_list.entities))
+                return entity_list
+
+        profiled_transform._frosta_profiled = True
+        frost_sta_client.utils.transform_json_to_entity_list = profiled_transform
+
+
+def _remove_entity_hook():
+    """Restore the original transform_json_to_entity_list after the last active profile."""
+    global _hook_users, _hook_original
+    with _hook_lock:
+        _hook_users -= 1
+        if _hook_users > 0:
+            return
+        # leave a function that was replaced by someone else in the meantime
+        if getattr(frost_sta_client.utils.transform_json_to_entity_list, '_frosta_profiled', False):
+            frost_sta_client.utils.transform_json_to_entity_list = _hook_original
+        _hook_original = None
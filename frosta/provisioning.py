@@ -0,0 +1,200 @@
+"""
+Batch provisioning of Thing graphs for FROST client.
+
+Onboarding a station with create_location, create_thing, create_sensor,
+create_observed_property and create_datastream takes one round-trip per
+entity. provision() takes a declarative description of many Things and
+creates them with few requests: shared Sensors and ObservedProperties are
+looked up by name (and created once if missing), then every Thing is sent
+as one deep insert with its Locations and Datastreams, combined into
+JSON $batch requests.
+"""
+import logging
+import requests
+from furl import furl
+from geojson import Point
+import frost_sta_client as fsc
+from frost_sta_client.model.entity import Entity
+from frost_sta_client.model.ext.entity_list import EntityList
+from frost_sta_client.model.ext.unitofmeasurement import UnitOfMeasurement
+from frost_sta_client.utils import extract_value, transform_entity_to_json_dict
+
+logger = logging.getLogger(__name__)
+
+# Status codes of servers that do not support JSON $batch requests
+BATCH_UNSUPPORTED = [404, 405, 415, 501]
+
+# Expansion of the provisioned Things returned by provision()
+THING_EXPANSION = 'Locations,Datastreams($expand=Sensor,ObservedProperty)'
+
+
+def as_point(location) -> Point:
+    """Convert a tuple, list, GeoJSON dict or dict with keys 'x' and 'y' into a Point."""
+    if isinstance(location, Point):
+        return location
+    if isinstance(location, tuple) or isinstance(location, list):
+        return Point(tuple(location))
+    if isinstance(location, dict):
+        if 'coordinates' in location:
+            return Point(tuple(location['coordinates']))
+        return Point((location.get('x'), location.get('y')))
+    raise TypeError("location must be a geojson Point, tuple, list, or dict with keys 'x' and 'y'")
+
+
+def provision(client, things: list[dict], batch_size: int=100, use_batch: bool=True) -> EntityList:
+    """
+    Create Things with their Locations and Datastreams from a declarative description.
+
+    Each Thing is a dictionary with the arguments of create_thing plus
+    'locations' (list of create_location arguments, or 'location' for one)
+    and 'datastreams' (list of create_datastream arguments). The 'sensor'
+    and 'observed_property' of a Datastream are either entities or
+    dictionaries with the arguments of create_sensor/create_observed_property.
+    Sensors and ObservedProperties with the same name (case-insensitive) are
+    shared and reused if they already exist on the server.
+
+    Args:
+        client: FrostClient to provision with
+        things: Description of the Things
+        batch_size: Number of entities per $batch request and query
+        use_batch: Combine requests into JSON $batch requests
+
+    Returns:
+        EntityList of the created Things with their Locations and Datastreams,
+        in the order of things
+    """
+    datastreams = [ds for thing in things for ds in thing.get('datastreams', [])]
+    shared = {
+        'sensor': _shared_entities(client, datastreams, 'sensor', fsc.Sensor, client.get_sensors, batch_size),
+        'observed_property': _shared_entities(
+            client, datastreams, 'observed_property', fsc.ObservedProperty, client.get_observed_properties, batch_size
+        )
+    }
+    new = [(plural, entity) for plural, entities in [('Sensors', shared['sensor']), ('ObservedProperties', shared['observed_property'])]
+           for entity in entities.values() if entity.id is None]
+    ids = post_entities(client, [(plural, transform_entity_to_json_dict(e)) for plural, e in new], batch_size, use_batch)
+    for (_, entity), id in zip(new, ids):
+        entity.id = id
+    logger.debug(f"Created {len(new)} shared Sensors/ObservedProperties")
+
+    bodies = [('Things', transform_entity_to_json_dict(_thing(client, thing, shared))) for thing in things]
+    thing_ids = post_entities(client, bodies, batch_size, use_batch)
+    logger.debug(f"Created {len(thing_ids)} Things by deep insert")
+
+    fetched = {}
+    for i in range(0, len(thing_ids), batch_size):
+        for thing in client.get_things(ids=thing_ids[i:i + batch_size], expand=THING_EXPANSION):
+            fetched[str(thing.id)] = thing
+    # get_things orders by name, the result follows the order of the descriptions
+    provisioned = EntityList(fsc.Thing.__module__ + '.Thing', entities=[
+        fetched[str(id)] for id in thing_ids if str(id) in fetched
+    ])
+    provisioned.set_service(client.service)
+    return provisioned
+
+
+def post_entities(client, bodies: list[tuple[str, dict]], batch_size: int=100, use_batch: bool=True) -> list:
+    """
+    Create entities from (entity set, JSON body) pairs and return their ids in order.
+
+    Uses JSON $batch requests of batch_size entities and falls back to one
+    POST per entity if the server does not support them.
+    """
+    ids = []
+    url = furl(client.service.url)
+    url.path.add('$batch')
+    for i in range(0, len(bodies), batch_size):
+        chunk = bodies[i:i + batch_size]
+        if not use_batch:
+            ids += [_post(client, plural, body) for plural, body in chunk]
+            continue
+        try:
+            response = client.service.execute('post', url, json={'requests': [
+                {'id': str(n), 'method': 'post', 'url': plural, 'body': body}
+                for n, (plural, body) in enumerate(chunk)
+            ]})
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code not in BATCH_UNSUPPORTED or i > 0:
+                raise
+            logger.info('JSON $batch not supported, creating entities individually')
+            use_batch = False
+            ids += [_post(client, plural, body) for plural, body in chunk]
+            continue
+        responses = sorted(response.json().get('responses', []), key=lambda r: int(r.get('id')))
+        if len(responses) != len(chunk):
+            raise ValueError(f'Expected {len(chunk)} responses to $batch request, received {len(responses)}')
+        for (plural, _), result in zip(chunk, responses):
+            if result.get('status', 500) >= 400:
+                raise ValueError(f"Creating {plural} failed with status-code {result.get('status')}, {result.get('body')}")
+            headers = {key.lower(): value for key, value in result.get('headers', {}).items()}
+            ids.append(extract_value(headers['location']))
+    return ids
+
+
+def _post(client, plural, body):
+    url = furl(client.service.url)
+    url.path.add(plural)
+    response = client.service.execute('post', url, json=body)
+    return extract_value(response.headers['location'])
+
+
+def _shared_entities(client, datastreams, attribute, entity_class, getter, batch_size):
+    """Map lower-case names to existing entities or new (unsaved) ones."""
+    entities = {}
+    for ds in datastreams:
+        value = ds.get(attribute)
+        if value is None:
+            raise ValueError(f"Cannot create Datastream {ds.get('name')} without {attribute}!")
+        if isinstance(value, Entity):
+            if value.id is None:
+                entities.setdefault(value.name.lower(), value)
+            continue
+        entities.setdefault(value['name'].lower(), entity_class(**value))
+    names = list(entities.keys())
+    for i in range(0, len(names), batch_size):
+        for existing in getter(name=names[i:i + batch_size]):
+            if existing.name.lower() in entities and entities[existing.name.lower()].id is None:
+                entities[existing.name.lower()] = existing
+    return entities
+
+
+def _thing(client, description, shared):
+    """Build the Thing entity for the deep insert of one Thing description."""
+    description = dict(description)
+    locations = description.pop('locations', None)
+    if locations is None:
+        location = description.pop('location', None)
+        locations = [location] if location is not None else []
+    datastreams = description.pop('datastreams', [])
+    return fsc.Thing(
+        locations=[_location(location) for location in locations],
+        datastreams=[_datastream(client, ds, shared) for ds in datastreams],
+        **description
+    )
+
+
+def _location(description):
+    if isinstance(description, Entity):
+        return description
+    description = dict(description)
+    description['location'] = as_point(description.get('location'))
+    if description.get('encoding_type', '') == '':
+        description['encoding_type'] = 'application/vnd.geo+json'
+    return fsc.Location(**description)
+
+
+def _datastream(client, description, shared):
+    description = dict(description)
+    for attribute, entity_class in [('sensor', fsc.Sensor), ('observed_property', fsc.ObservedProperty)]:
+        value = description[attribute]
+        if not (isinstance(value, Entity) and value.id is not None):
+            name = value.name if isinstance(value, Entity) else value['name']
+            value = shared[attribute][name.lower()]
+        # reference by id only, the entity itself exists already
+        description[attribute] = entity_class(id=value.id)
+    unit = description.get('unit_of_measurement')
+    if isinstance(unit, dict):
+        description['unit_of_measurement'] = UnitOfMeasurement(**unit)
+    observation_type = description.get('observation_type', '')
+    description['observation_type'] = client.OBSERVATION_TYPES.get(observation_type, observation_type)
+    return fsc.Datastream(**description)
@@ -6,42 +6,43 @@ from frost_sta_client.model.ext.entity_type import EntityTypes
 from frost_sta_client.model.entity import Entity
 from frost_sta_client.model.ext.entity_list import EntityList
 import logging
+from .profiling import phase
 
 RELATIONS = {
     'Location': {
-        'Thing': 'Thing',
+        'Thing': 'Things',
         'Datastream': 'Things/Datastreams',
         'Sensor': 'Things/Datastreams/Sensor',
         'ObservedProperty': 'Things/Datastreams/ObservedProperty',
-        'Observation': 'Things/Datastreams/Observation'
+        'Observation': 'Things/Datastreams/Observations'
     },
     'Thing': {
         'Location': 'Locations',
-        'Datastream': 'Datastream',
-        'Sensor': 'Sensor',
-        'ObservedProperty': 'ObservedProperty',
-        'Observation': 'Observation'
+        'Datastream': 'Datastreams',
+        'Sensor': 'Datastreams/Sensor',
+        'ObservedProperty': 'Datastreams/ObservedProperty',
+        'Observation': 'Datastreams/Observations'
     },
     'Datastream': {
         'Location': 'Thing/Locations',
         'Thing': 'Thing',
         'Sensor': 'Sensor',
         'ObservedProperty': 'ObservedProperty',
-        'Observation': 'Observation'
+        'Observation': 'Observations'
     },
     'Sensor': {
         'Location': 'Datastreams/Thing/Locations',
-        'Thing': 'Datastream/Thing',
-        'Datastream': 'Datastream',
-        'ObservedProperty': 'Datastream/ObservedProperty',
-        'Observation': 'Datastream/Observation'
+        'Thing': 'Datastreams/Thing',
+        'Datastream': 'Datastreams',
+        'ObservedProperty': 'Datastreams/ObservedProperty',
+        'Observation': 'Datastreams/Observations'
     },
     'ObservedProperty': {
         'Location': 'Datastreams/Thing/Locations',
         'Thing': 'Datastreams/Thing',
         'Datastream': 'Datastreams',
         'Sensor': 'Datastreams/Sensor',
-        'Observation': 'Datastreams/Observation'
+        'Observation': 'Datastreams/Observations'
     },
     'Observation': {
         'Location': 'Datastream/Thing/Locations',
@@ -56,12 +57,13 @@ def get_relation(origin, target):
     return RELATIONS.get(origin, {}).get(target)
 
 def get_entity_list(entities, callback=None, step_size=None, **kwargs):
-    query = entities.query()
-    query = add_filters(query, **kwargs)
-    query = add_selection(query, **kwargs)
-    query = add_expansion(query, **kwargs)
-    query = add_order(query, **kwargs)
-    query = add_chunks(query, **kwargs)
+    with phase('build_query'):
+        query = entities.query()
+        query = add_filters(query, **kwargs)
+        query = add_selection(query, **kwargs)
+        query = add_expansion(query, **kwargs)
+        query = add_order(query, **kwargs)
+        query = add_chunks(query, **kwargs)
 
     return query.count().list(callback, step_size)
 
@@ -78,12 +80,19 @@ def add_filters(query, **kwargs):
                 filter = get_relation_filter(query.entity, relative)
                 if filter is not None:
                     filters.append(filter)
-        elif key in ['id', 'name', 'description'] and value != '':
-            filters.append(get_string_filter(key, value))
+        elif key in ['id', 'name', 'description'] and value != '' and value != []:
+            if isinstance(value, list):
+                filters.append('(' + ' or '.join(get_string_filter(key, v) for v in value) + ')')
+            else:
+                filters.append(get_string_filter(key, value))
+        elif key == 'ids' and value is not None:
+            filters.append(get_ids_filter(value))
         elif key in ['start', 'end'] and value is not None:
             filters.append(get_time_filter(key, value))
         elif key in ['lower_limit', 'upper_limit'] and value is not None:
             filters.append(get_limit_filter(key, value))
+        elif key in ['bbox', 'polygon', 'near'] and value is not None:
+            filters.append(get_spatial_filter(query.entity, key, value))
     filters = [f for f in filters if f is not None]
     if len(filters) > 0:
         return query.filter(' and '.join(filters))
@@ -99,6 +108,11 @@ def add_selection(query, **kwargs):
     return query
 
 def add_expansion(query, **kwargs):
+    if 'expand' in kwargs.keys() and kwargs.get('expand') is not None:
+        # an empty string disables the default expansion, e.g. for minimal $select queries
+        if kwargs.get('expand') == '':
+            return query
+        return query.expand(kwargs.get('expand'))
     if query.entity == 'Datastream':
         return query.expand(
             "Thing($select=@iot.id),Thing/Locations($select=@iot.id,name,location),"\
@@ -146,6 +160,11 @@ def get_string_filter(key, value):
             return f"startswith(tolower({key}), '{value[:-1]}')"
     return f"'{value}' eq tolower({key})"
 
+def get_ids_filter(ids):
+    # exact match of entity ids, numeric ids are not quoted
+    alternatives = [f'id eq {i}' if isinstance(i, int) else f"id eq '{i}'" for i in ids]
+    return '(' + ' or '.join(alternatives) + ')'
+
 def get_time_filter(key, value):
     if isinstance(value, str):
         value = parse(value)
@@ -163,3 +182,31 @@ def get_limit_filter(key, value):
         return f'result lt {value}'
     if key == 'lower_limit':
         return f'result ge {value}'
+
+def get_spatial_filter(entity, key, value):
+    # spatial filters apply to the location of the entity's Location(s)
+    if entity == 'Location':
+        path = 'location'
+    elif get_relation(entity, 'Location') is not None:
+        path = get_relation(entity, 'Location') + '/location'
+    else:
+        return None
+    if key == 'bbox':
+        min_x, min_y, max_x, max_y = value
+        ring = [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y), (min_x, min_y)]
+        return f"geo.intersects({path}, geography'{get_wkt_polygon(ring)}')"
+    if key == 'polygon':
+        if isinstance(value, dict):
+            value = value['coordinates'][0]
+        return f"st_within({path}, geography'{get_wkt_polygon(value)}')"
+    if key == 'near':
+        point, distance = value
+        if isinstance(point, dict):
+            point = point['coordinates']
+        return f"geo.distance({path}, geography'POINT({point[0]} {point[1]})') lt {distance}"
+
+def get_wkt_polygon(ring):
+    ring = [tuple(coordinates[:2]) for coordinates in ring]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return 'POLYGON((' + ', '.join(f'{x} {y}' for x, y in ring) + '))'
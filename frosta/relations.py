@@ -0,0 +1,172 @@
+"""
+Lazy loading of entity relations for FROST client.
+
+Looking up the Thing, Sensor or ObservedProperty of each Datastream one by
+one issues one request per entity (N+1 queries). Instead, lazy relation
+proxies are attached to the returned entities. The first access of any
+proxy resolves the proxies of the same relation attached by the same call
+in one batched query, using the OR filter built by get_relation_filter.
+"""
+import re
+import threading
+import logging
+from frost_sta_client.model.ext.entity_list import EntityList
+from frost_sta_client.model.ext.entity_type import EntityTypes
+from frost_sta_client.utils import class_from_string
+from .query_functions import get_entity_list, get_relation
+from .profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+# Relations resolved lazily: origin entity type -> {attribute: target entity type}
+LAZY_RELATIONS = {
+    'Datastream': {
+        'thing': 'Thing',
+        'sensor': 'Sensor',
+        'observed_property': 'ObservedProperty'
+    }
+}
+
+# Maximum number of origin entities combined in one OR filter
+BATCH_SIZE = 100
+
+
+def dao_name(entity_type):
+    """Name of the SensorThingsService method returning the Dao, e.g. 'observed_properties'."""
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', entity_type['plural']).lower()
+
+
+class LazyRelation:
+    """
+    Placeholder for a related entity that is fetched on first access.
+
+    The proxy passes isinstance checks for the target class, so it can be
+    assigned to entity properties and passed to create_* methods. Serialised
+    (e.g. when creating a Datastream), it is a reference by @iot.id and only
+    needs a query if the id of the related entity is not known yet.
+    Proxies compare by identity, so == and in checks never trigger a query.
+    """
+    __slots__ = ('_resolver', '_origin', '_attribute', '_target_class', '_id', '_target', '_resolved', '_group')
+
+    def __init__(self, resolver, origin, attribute, target_class, id=None, group=None):
+        object.__setattr__(self, '_resolver', resolver)
+        object.__setattr__(self, '_origin', origin)
+        object.__setattr__(self, '_attribute', attribute)
+        object.__setattr__(self, '_target_class', target_class)
+        object.__setattr__(self, '_id', id)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_resolved', False)
+        # proxies of the same relation attached together, resolved in one batch
+        object.__setattr__(self, '_group', group if group is not None else [self])
+
+    @property
+    def __class__(self):
+        return self._target_class
+
+    @property
+    def id(self):
+        if self._id is not None:
+            return self._id
+        target = self.resolve()
+        return target.id if target is not None else None
+
+    def resolve(self):
+        """Return the related entity, resolving all pending proxies of this relation."""
+        if not self._resolved:
+            self._resolver.resolve(self)
+        return self._target
+
+    def __getattr__(self, name):
+        target = self.resolve()
+        if target is None:
+            raise AttributeError(f'{type(self._origin).__name__} {self._origin.id} has no {self._attribute}')
+        return getattr(target, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+
+    def __getstate__(self):
+        return {'@iot.id': self.id}
+
+    def __repr__(self):
+        state = 'resolved' if self._resolved else 'pending'
+        return f'<LazyRelation {self._target_class.__name__} id={self._id} ({state})>'
+
+
+class RelationResolver:
+    """
+    Attaches lazy relations and resolves them in batches.
+
+    The resolver keeps no references to pending proxies: each attach call
+    forms one group per relation, held only by its proxies. Entities that are
+    never accessed are freed with their proxies and are not queried later.
+    """
+
+    def __init__(self, client, batch_size=BATCH_SIZE):
+        self.client = client
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+
+    def attach(self, entities):
+        """
+        Replace the missing relations listed in LAZY_RELATIONS with lazy proxies.
+
+        Relations that were expanded by the query are kept as they are, so
+        accessing them never triggers a query.
+        """
+        if not isinstance(entities, (EntityList, list)):
+            entities = [entities]
+        groups = {}
+        for origin in entities:
+            origin_type = type(origin).__name__
+            for attribute, target_type in LAZY_RELATIONS.get(origin_type, {}).items():
+                if getattr(origin, attribute) is not None:
+                    continue
+                proxy = LazyRelation(
+                    self,
+                    origin,
+                    attribute,
+                    class_from_string(EntityTypes[target_type]['class']),
+                    group=groups.setdefault((origin_type, attribute), [])
+                )
+                proxy._group.append(proxy)
+                setattr(origin, attribute, proxy)
+        return entities
+
+    @profiled
+    def resolve(self, proxy):
+        """Resolve proxy and the unresolved proxies of its group."""
+        with self._lock:
+            if proxy._resolved:
+                return
+            pending = [item for item in proxy._group if not item._resolved]
+            targets = self._query(type(proxy._origin).__name__, EntityTypes[proxy._target_class.__name__], pending)
+            for item in pending:
+                target = targets.get(item._origin.id)
+                object.__setattr__(item, '_target', target)
+                object.__setattr__(item, '_resolved', True)
+                if getattr(item._origin, item._attribute) is item:
+                    setattr(item._origin, item._attribute, target)
+            proxy._group.clear()
+
+    def _query(self, origin_type, target_type, pending):
+        """Fetch the targets of all pending proxies, mapped by origin id."""
+        origins = list({id(p._origin): p._origin for p in pending}.values())
+        reverse = get_relation(target_type['singular'], origin_type)
+        origin_class = EntityTypes[origin_type]['class']
+        targets = {}
+        for i in range(0, len(origins), self.batch_size):
+            batch = origins[i:i + self.batch_size]
+            ids = ' or '.join(f"'{origin.id}' eq id" for origin in batch)
+            entity_list = get_entity_list(
+                getattr(self.client.service, dao_name(target_type))(),
+                relations=EntityList(origin_class, entities=batch),
+                expand=f'{reverse}($select=@iot.id;$filter={ids})'
+            )
+            for target in entity_list:
+                for origin in getattr(target, reverse.lower()) or []:
+                    targets[origin.id] = target
+                # the expansion only served the mapping and is not part of the entity
+                setattr(target, reverse.lower(), None)
+            logger.debug(f"Resolved {len(batch)} {origin_type}/{target_type['singular']} relations in one query")
+        return targets
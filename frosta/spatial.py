@@ -0,0 +1,178 @@
+"""
+Client-side spatial index for FROST Locations.
+
+Servers without the OData geospatial functions (or map clients issuing many
+small queries) would have to download all Locations and loop over them for
+every "nearest stations" lookup. LocationIndex keeps the Locations in a
+regular grid over an equirectangular projection, so bbox, radius, polygon
+and nearest-neighbour queries only look at a few grid cells.
+
+Distances are in metres and approximate (equirectangular projection around
+the mean latitude), which is accurate for regional networks.
+"""
+import math
+import numpy as np
+from frost_sta_client.model.location import Location
+
+EARTH_RADIUS = 6371008.8
+
+
+def representative_point(geometry) -> tuple[float, float]:
+    """Return (x, y) of a Point or the bounding box centre of other GeoJSON geometries."""
+    if geometry is None:
+        return (math.nan, math.nan)
+    if geometry.get('type') == 'Feature':
+        return representative_point(geometry.get('geometry'))
+    coordinates = geometry.get('coordinates')
+    if geometry.get('type') == 'Point':
+        return (float(coordinates[0]), float(coordinates[1]))
+    points = np.array(list(_flatten(coordinates)), dtype='float64').reshape(-1, 2)
+    if len(points) == 0:
+        return (math.nan, math.nan)
+    return tuple((points.min(axis=0) + points.max(axis=0)) / 2)
+
+
+def _flatten(coordinates):
+    if len(coordinates) > 0 and isinstance(coordinates[0], (int, float)):
+        yield coordinates[:2]
+        return
+    for item in coordinates:
+        yield from _flatten(item)
+
+
+class LocationIndex:
+    """Grid index over the representative points of Locations."""
+
+    def __init__(self, locations, cell_size: float | None=None):
+        """
+        Build the index.
+
+        Args:
+            locations: Locations (EntityList or list) to index, others are ignored
+            cell_size: Edge length of the grid cells in metres (default: about
+                two Locations per cell for uniformly spread Locations)
+        """
+        locations = [l for l in locations if isinstance(l, Location)]
+        points = np.array([representative_point(l.location) for l in locations], dtype='float64').reshape(-1, 2)
+        valid = ~np.isnan(points).any(axis=1)
+        self.locations = [l for l, v in zip(locations, valid) if v]
+        self.lon = points[valid, 0]
+        self.lat = points[valid, 1]
+        self._scale_x = EARTH_RADIUS * math.radians(1) * math.cos(math.radians(self.lat.mean())) \
+            if len(self.lat) > 0 else EARTH_RADIUS * math.radians(1)
+        self._scale_y = EARTH_RADIUS * math.radians(1)
+        self.x, self.y = self._project(self.lon, self.lat)
+
+        if cell_size is None:
+            extent = max(np.ptp(self.x), np.ptp(self.y)) if len(self.x) > 0 else 0.0
+            cell_size = extent / max(math.sqrt(len(self.x) / 2), 1.0) or 1000.0
+        self.cell_size = cell_size
+
+        cells_x = np.floor(self.x / cell_size).astype('int64')
+        cells_y = np.floor(self.y / cell_size).astype('int64')
+        order = np.lexsort((cells_y, cells_x))
+        keys = np.stack([cells_x[order], cells_y[order]], axis=1)
+        unique, starts = np.unique(keys, axis=0, return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self._cells = {
+            (int(cx), int(cy)): order[start:end]
+            for (cx, cy), start, end in zip(unique, starts, ends)
+        }
+
+    def __len__(self):
+        return len(self.locations)
+
+    def _project(self, lon, lat):
+        return np.asarray(lon) * self._scale_x, np.asarray(lat) * self._scale_y
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _candidates(self, min_x, min_y, max_x, max_y):
+        """Indices of the Locations in all cells overlapping the projected rectangle."""
+        min_cx, min_cy = self._cell(min_x, min_y)
+        max_cx, max_cy = self._cell(max_x, max_y)
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self._cells):
+            blocks = [i for (cx, cy), i in self._cells.items()
+                      if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy]
+        else:
+            blocks = [self._cells[(cx, cy)]
+                      for cx in range(min_cx, max_cx + 1)
+                      for cy in range(min_cy, max_cy + 1)
+                      if (cx, cy) in self._cells]
+        if len(blocks) == 0:
+            return np.empty(0, dtype='int64')
+        return np.concatenate(blocks)
+
+    def _ring(self, cx, cy, r):
+        """Indices of the Locations in the cells at Chebyshev distance r from (cx, cy)."""
+        if r == 0:
+            keys = [(cx, cy)]
+        else:
+            keys = [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in (-r, r)] \
+                + [(cx + dx, cy + dy) for dx in (-r, r) for dy in range(-r + 1, r)]
+        return [self._cells[key] for key in keys if key in self._cells]
+
+    def within_bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> list[Location]:
+        """Locations whose point lies within the bounding box given in longitude/latitude."""
+        (px0, px1), (py0, py1) = self._project([min_x, max_x], [min_y, max_y])
+        candidates = self._candidates(px0, py0, px1, py1)
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        hits = candidates[(lon >= min_x) & (lon <= max_x) & (lat >= min_y) & (lat <= max_y)]
+        return [self.locations[i] for i in np.sort(hits)]
+
+    def within_radius(self, point, radius: float) -> list[Location]:
+        """Locations within radius metres of point (lon, lat), nearest first."""
+        px, py = self._project(point[0], point[1])
+        candidates = self._candidates(px - radius, py - radius, px + radius, py + radius)
+        distances = np.hypot(self.x[candidates] - px, self.y[candidates] - py)
+        inside = distances <= radius
+        hits = candidates[inside][np.argsort(distances[inside], kind='stable')]
+        return [self.locations[i] for i in hits]
+
+    def within_polygon(self, polygon) -> list[Location]:
+        """Locations whose point lies within a polygon ring or GeoJSON Polygon."""
+        if isinstance(polygon, dict):
+            polygon = polygon['coordinates'][0]
+        ring = np.array([coordinates[:2] for coordinates in polygon], dtype='float64')
+        (px0, px1), (py0, py1) = self._project(
+            [ring[:, 0].min(), ring[:, 0].max()], [ring[:, 1].min(), ring[:, 1].max()]
+        )
+        candidates = self._candidates(px0, py0, px1, py1)
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        # even-odd rule, vectorised over the candidates for each edge
+        inside = np.zeros(len(candidates), dtype=bool)
+        for (x0, y0), (x1, y1) in zip(ring, np.roll(ring, -1, axis=0)):
+            crosses = (y0 > lat) != (y1 > lat)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = x0 + (lat - y0) * (x1 - x0) / (y1 - y0)
+            inside ^= crosses & (lon < x_cross)
+        return [self.locations[i] for i in np.sort(candidates[inside])]
+
+    def nearest(self, point, k: int=1) -> list[Location]:
+        """The k Locations nearest to point (lon, lat), nearest first."""
+        if len(self.locations) == 0:
+            return []
+        k = min(k, len(self.locations))
+        px, py = self._project(point[0], point[1])
+        cx, cy = self._cell(px, py)
+        blocks = []
+        count = 0
+        r = 0
+        # all points outside the searched rings are at least r * cell_size away;
+        # once the rings span more cells than are occupied, a full scan is cheaper
+        while (2 * r + 1) ** 2 <= 4 * len(self._cells):
+            for block in self._ring(cx, cy, r):
+                blocks.append(block)
+                count += len(block)
+            if count >= k:
+                candidates = np.concatenate(blocks)
+                distances = np.hypot(self.x[candidates] - px, self.y[candidates] - py)
+                best = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+                best = best[np.argsort(distances[best], kind='stable')]
+                if distances[best[-1]] <= r * self.cell_size:
+                    return [self.locations[i] for i in candidates[best]]
+            r += 1
+        distances = np.hypot(self.x - px, self.y - py)
+        best = np.argsort(distances, kind='stable')[:k]
+        return [self.locations[i] for i in best]
@@ -0,0 +1,287 @@
+"""
+Memory-mapped storage of observations for FROST client.
+
+Reloading long observation histories from FROST means transferring and
+parsing the same JSON every session. ObservationStore keeps the time series
+of each datastream in a directory of two columnar files: phenomenonTimes as
+int64 nanoseconds (UTC, sorted, unique) and results as float64. Both are
+memory-mapped, so time-range queries are a binary search on the times and
+return pd.Series that are zero-copy views on the files, paged in by the OS
+on demand. The time ranges already fetched from the server are kept as
+covered intervals, so FrostClient.get_time_series(store=...) only fetches
+what is missing. Observations can reach the server late (batch uploads of
+loggers, ingest delay, clock skew), so the last settle time before a call
+is fetched but not marked as covered, and fetched again by the next call.
+
+Appending newer observations only extends the files; observations older
+than the stored ones are merged by rewriting the files. A store can be
+shared by the threads of one process, not by several writing processes.
+"""
+import os
+import json
+import shutil
+import threading
+import logging
+from datetime import datetime
+from urllib.parse import quote, unquote
+import numpy as np
+import pandas as pd
+from dateutil.parser import parse
+from dateutil.tz import tzutc
+
+logger = logging.getLogger(__name__)
+
+# Open bounds of covered intervals and time-range queries
+MIN_TIME = int(np.iinfo('int64').min)
+MAX_TIME = int(np.iinfo('int64').max)
+
+# Files of the columns in the directory of a datastream
+COLUMNS = {'time': ('time.i8', 'int64'), 'result': ('result.f8', 'float64')}
+META_FILE = 'meta.json'
+
+# Default time before a call that is not marked as covered, see ObservationStore
+SETTLE_TIME = '1D'
+
+
+def to_nanoseconds(value, default: int) -> int:
+    """
+    Convert a time bound into UTC nanoseconds.
+
+    Strings and datetimes are interpreted like the start/end filters of the
+    queries, i.e. naive values are in local time. None returns default.
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = parse(value)
+    if isinstance(value, datetime):
+        return pd.Timestamp(value.astimezone(tzutc())).as_unit('ns').value
+    raise TypeError(f'Cannot convert {value!r} into a time bound')
+
+
+def from_nanoseconds(value: int) -> datetime | None:
+    """Inverse of to_nanoseconds for the bounds passed to queries, None for open bounds."""
+    if value in [MIN_TIME, MAX_TIME]:
+        return None
+    return pd.Timestamp(value, unit='ns', tz='UTC').to_pydatetime()
+
+
+def merge_intervals(intervals: list) -> list[list[int]]:
+    """Merge overlapping and adjacent [start, end) intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class ObservationStore:
+    """Directory of memory-mapped time series, one subdirectory per datastream."""
+
+    def __init__(self, path: str, settle=SETTLE_TIME):
+        """
+        Args:
+            path: Directory of the store, created if it does not exist
+            settle: Time after which the server is assumed to have received all
+                observations (pd.Timedelta or string like '6h')
+        """
+        self.path = path
+        self.settle = pd.Timedelta(settle)
+        if self.settle < pd.Timedelta(0):
+            raise ValueError("settle must not be negative!")
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+
+    def _directory(self, datastream_id):
+        return os.path.join(self.path, quote(str(datastream_id), safe=''))
+
+    def __contains__(self, datastream_id):
+        return os.path.exists(os.path.join(self._directory(datastream_id), META_FILE))
+
+    def datastreams(self) -> list[str]:
+        """Ids of the stored datastreams."""
+        return sorted(
+            unquote(name) for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, name, META_FILE))
+        )
+
+    def delete(self, datastream_id):
+        """Remove the stored time series of a datastream."""
+        with self._lock:
+            shutil.rmtree(self._directory(datastream_id), ignore_errors=True)
+
+    def _read_meta(self, datastream_id):
+        try:
+            with open(os.path.join(self._directory(datastream_id), META_FILE)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {'datastream': str(datastream_id), 'count': 0, 'covered': []}
+
+    def _write_meta(self, datastream_id, meta):
+        path = os.path.join(self._directory(datastream_id), META_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(path + '.tmp', path)
+
+    def count(self, datastream_id) -> int:
+        """Number of stored observations of a datastream."""
+        return self._read_meta(datastream_id)['count']
+
+    def arrays(self, datastream_id) -> tuple[np.ndarray, np.ndarray]:
+        """Read-only memory maps of the times (UTC nanoseconds) and results."""
+        count = self._read_meta(datastream_id)['count']
+        arrays = []
+        for file_name, dtype in COLUMNS.values():
+            if count == 0:
+                arrays.append(np.empty(0, dtype=dtype))
+                continue
+            arrays.append(np.memmap(
+                os.path.join(self._directory(datastream_id), file_name), dtype=dtype, mode='r', shape=(count,)
+            ))
+        return arrays[0], arrays[1]
+
+    def covered(self, datastream_id) -> list[tuple[pd.Timestamp | None, pd.Timestamp | None]]:
+        """Time ranges [start, end) fetched completely, None for open bounds."""
+        return [
+            tuple(None if bound in [MIN_TIME, MAX_TIME] else pd.Timestamp(bound, unit='ns', tz='UTC')
+                  for bound in interval)
+            for interval in self._read_meta(datastream_id)['covered']
+        ]
+
+    def missing(self, datastream_id, start=None, end=None) -> list[tuple[int, int]]:
+        """
+        Time ranges within [start, end) that are not covered yet.
+
+        Returns:
+            List of (start, end) in UTC nanoseconds, MIN_TIME/MAX_TIME for open bounds
+        """
+        start = to_nanoseconds(start, MIN_TIME)
+        end = to_nanoseconds(end, MAX_TIME)
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self._read_meta(datastream_id)['covered']:
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def write(self, datastream_id, series: pd.Series | None, start=None, end=None, cover: bool=True) -> int:
+        """
+        Merge a time series into the store and mark [start, end) as covered.
+
+        Observations at times that are stored already are replaced.
+
+        Args:
+            datastream_id: Id of the datastream
+            series: Numeric results indexed by phenomenonTime (naive times are UTC), or None
+            start: Start of the covered range (default: first time of series)
+            end: End of the covered range (default: just after the last time of series)
+            cover: Mark [start, end) as covered, False only stores the observations
+
+        Returns:
+            Number of stored observations of the datastream
+        """
+        times = np.empty(0, dtype='int64')
+        results = np.empty(0, dtype='float64')
+        if series is not None and len(series) > 0:
+            index = pd.DatetimeIndex(series.index)
+            if index.tz is None:
+                index = index.tz_localize('UTC')
+            times = index.as_unit('ns').asi8
+            try:
+                results = pd.to_numeric(series).to_numpy(dtype='float64', na_value=np.nan)
+            except (ValueError, TypeError):
+                raise ValueError(f'Only numeric results can be stored, datastream {datastream_id} has others')
+            if not index.is_monotonic_increasing:
+                order = np.argsort(times, kind='stable')
+                times, results = times[order], results[order]
+            # duplicate times within the series: the last one wins
+            keep = np.append(times[1:] != times[:-1], True)
+            times, results = times[keep], results[keep]
+
+        with self._lock:
+            os.makedirs(self._directory(datastream_id), exist_ok=True)
+            meta = self._read_meta(datastream_id)
+            if len(times) > 0:
+                stored_times, _ = self.arrays(datastream_id)
+                if meta['count'] == 0 or times[0] > stored_times[-1]:
+                    self._append(datastream_id, meta['count'], times, results)
+                    meta['count'] += len(times)
+                else:
+                    meta['count'] = self._merge(datastream_id, times, results)
+            if cover and (start is not None or len(times) > 0):
+                interval_start = to_nanoseconds(start, MIN_TIME) if start is not None else int(times[0])
+                interval_end = to_nanoseconds(end, MAX_TIME) if end is not None else int(times[-1]) + 1
+                meta['covered'] = merge_intervals(meta['covered'] + [[interval_start, interval_end]])
+            self._write_meta(datastream_id, meta)
+            logger.debug(f"Stored {len(times)} observations of datastream {datastream_id}, {meta['count']} in total")
+            return meta['count']
+
+    def _append(self, datastream_id, count, times, results):
+        """Extend the column files, dropping anything after the committed count."""
+        for (file_name, dtype), values in zip(COLUMNS.values(), [times, results]):
+            path = os.path.join(self._directory(datastream_id), file_name)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as file:
+                file.truncate(count * np.dtype(dtype).itemsize)
+                file.seek(0, os.SEEK_END)
+                file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+    def _merge(self, datastream_id, times, results):
+        """Rewrite the column files with the sorted union of stored and new observations."""
+        stored_times, stored_results = self.arrays(datastream_id)
+        # stable sort of two sorted runs, new observations after stored ones with the same time
+        merged_times = np.concatenate([stored_times, times])
+        merged_results = np.concatenate([stored_results, results])
+        order = np.argsort(merged_times, kind='stable')
+        merged_times, merged_results = merged_times[order], merged_results[order]
+        keep = np.append(merged_times[1:] != merged_times[:-1], True)
+        merged_times, merged_results = merged_times[keep], merged_results[keep]
+        del stored_times, stored_results
+        # replacing the files leaves memory maps of the old files intact
+        for (file_name, dtype), values in zip(COLUMNS.values(), [merged_times, merged_results]):
+            path = os.path.join(self._directory(datastream_id), file_name)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            os.replace(path + '.tmp', path)
+        return len(merged_times)
+
+    def read(self, datastream_id, start=None, end=None, tz='UTC', name=None) -> pd.Series | None:
+        """
+        Stored observations within [start, end) as zero-copy view on the files.
+
+        The returned series is read-only and stays valid when the store changes.
+
+        Args:
+            datastream_id: Id of the datastream
+            start: Start of the time range (inclusive)
+            end: End of the time range (exclusive)
+            tz: Time zone of the returned index
+            name: Name of the series (default: datastream_id)
+
+        Returns:
+            pd.Series of results indexed by phenomenonTime, None if there are no observations
+        """
+        times, results = self.arrays(datastream_id)
+        first = np.searchsorted(times, to_nanoseconds(start, MIN_TIME), side='left')
+        last = np.searchsorted(times, to_nanoseconds(end, MAX_TIME), side='left')
+        if last <= first:
+            return None
+        index = pd.DatetimeIndex(times[first:last], dtype='datetime64[ns, UTC]', copy=False)
+        if tz != 'UTC':
+            index = index.tz_convert(tz)
+        return pd.Series(
+            results[first:last],
+            index=index,
+            name=datastream_id if name is None else name,
+            copy=False
+        )
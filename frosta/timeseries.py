@@ -0,0 +1,272 @@
+"""
+Vectorised analysis of time series returned by as_time_series.
+
+Gap detection, resampling and outlier flags work on the pd.Series of
+get_time_series or on consecutive chunks of it (e.g. from
+FrostClient.iter_time_series), so year-long series never need to be held
+in memory at once. GapDetector and Resampler carry the state that spans
+chunk boundaries; detect_gaps and resample are shortcuts that feed them a
+Series or an iterable of chunks. Chunks must be in chronological order.
+"""
+from typing import Iterable
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Day, Tick
+
+# Aggregations of Resampler, all of them can be combined across chunks
+AGGREGATIONS = ['mean', 'sum', 'min', 'max', 'count', 'first', 'last']
+
+# Partial statistics of one bin, from which every aggregation is derived
+_STATISTICS = ['sum', 'count', 'min', 'max', 'first', 'last']
+
+
+def flag_outliers(series: pd.Series, lower_limit: float | None=None, upper_limit: float | None=None) -> pd.Series:
+    """
+    Flag results outside the limits, with the semantics of the lower_limit and
+    upper_limit filters of get_observations: valid results are >= lower_limit
+    and < upper_limit. Non-numeric results are not flagged. Flags do not
+    depend on neighbouring points, so chunks can be flagged one by one.
+
+    Args:
+        series: Time series (or chunk of it)
+        lower_limit: Smallest valid result
+        upper_limit: Results from this value on are outliers
+
+    Returns:
+        Boolean pd.Series with the index of series, True for outliers
+    """
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    flags = np.zeros(len(values), dtype=bool)
+    if lower_limit is not None:
+        flags |= values < lower_limit
+    if upper_limit is not None:
+        flags |= values >= upper_limit
+    return pd.Series(flags, index=series.index, name=series.name)
+
+
+def detect_gaps(data: pd.Series | Iterable[pd.Series] | None, interval, tolerance: float=1.5) -> pd.DataFrame:
+    """
+    Find gaps in a time series or in consecutive chunks of it.
+
+    Args:
+        data: Time series or iterable of chronological chunks
+        interval: Expected sampling interval (pd.Timedelta or string like '10min')
+        tolerance: Multiple of interval from which a distance between two points is a gap
+
+    Returns:
+        pd.DataFrame with one row per gap, see GapDetector.result
+    """
+    detector = GapDetector(interval, tolerance)
+    for chunk in _chunks(data):
+        detector.update(chunk)
+    return detector.result()
+
+
+def resample(data: pd.Series | Iterable[pd.Series] | None, rule, how: str | list[str]='mean') -> pd.Series | pd.DataFrame:
+    """
+    Aggregate a time series or consecutive chunks of it into regular bins.
+
+    Args:
+        data: Time series or iterable of chronological chunks
+        rule: Bin width as pandas offset (e.g. '1h', '1D', 'MS')
+        how: Aggregation or list of aggregations out of AGGREGATIONS
+
+    Returns:
+        pd.Series for one aggregation, pd.DataFrame with one column per aggregation otherwise
+    """
+    resampler = Resampler(rule, how)
+    for chunk in _chunks(data):
+        resampler.update(chunk)
+    return resampler.result()
+
+
+def _chunks(data):
+    if data is None:
+        return
+    if isinstance(data, pd.Series):
+        yield data
+        return
+    for chunk in data:
+        if chunk is not None:
+            yield chunk
+
+
+def _sorted(chunk):
+    if not chunk.index.is_monotonic_increasing:
+        chunk = chunk.sort_index(kind='stable')
+    return chunk
+
+
+class GapDetector:
+    """Streaming detection of gaps against the expected sampling interval."""
+
+    def __init__(self, interval, tolerance: float=1.5):
+        """
+        Args:
+            interval: Expected sampling interval (pd.Timedelta or string like '10min')
+            tolerance: Multiple of interval from which a distance between two points is a gap
+        """
+        self.interval = pd.Timedelta(interval)
+        if self.interval <= pd.Timedelta(0):
+            raise ValueError("interval must be positive!")
+        if tolerance < 1:
+            raise ValueError("tolerance must be at least 1!")
+        self.tolerance = tolerance
+        self._threshold = self.interval.value * tolerance
+        self._last = None
+        self._tz = None
+        self._starts = []
+        self._ends = []
+
+    def update(self, chunk: pd.Series):
+        """Detect the gaps within chunk and between the previous chunk and chunk."""
+        if chunk is None or len(chunk) == 0:
+            return self
+        index = _sorted(chunk).index
+        times = index.as_unit('ns').asi8
+        if self._last is not None:
+            if times[0] < self._last:
+                raise ValueError("Chunks must be in chronological order!")
+            times = np.concatenate(([self._last], times))
+        gaps = np.flatnonzero(np.diff(times) >= self._threshold)
+        self._starts.append(times[gaps])
+        self._ends.append(times[gaps + 1])
+        self._last = times[-1]
+        self._tz = index.tz
+        return self
+
+    def result(self) -> pd.DataFrame:
+        """
+        Gaps found so far.
+
+        Returns:
+            pd.DataFrame with columns start and end (the points enclosing the gap),
+            duration and missing (number of points expected within the gap)
+        """
+        starts = np.concatenate(self._starts) if len(self._starts) > 0 else np.empty(0, dtype='int64')
+        ends = np.concatenate(self._ends) if len(self._ends) > 0 else np.empty(0, dtype='int64')
+        durations = ends - starts
+        missing = np.maximum(np.rint(durations / self.interval.value).astype('int64') - 1, 0)
+        return pd.DataFrame({
+            'start': self._timestamps(starts),
+            'end': self._timestamps(ends),
+            'duration': pd.to_timedelta(durations, unit='ns'),
+            'missing': missing
+        })
+
+    def _timestamps(self, values):
+        if self._tz is None:
+            return pd.to_datetime(values, unit='ns')
+        return pd.to_datetime(values, unit='ns', utc=True).tz_convert(self._tz)
+
+
+class Resampler:
+    """
+    Streaming aggregation into regular bins.
+
+    Each chunk is reduced to partial statistics per bin with one vectorised
+    resample. Bins of fixed width (e.g. '7min', '2D') are anchored at the
+    midnight before the first timestamp of the first chunk, like pandas does
+    for the whole series, so the bins of all chunks line up; calendar rules
+    ('1D', 'W', 'MS') are aligned by definition. Only the last bin of a chunk
+    can continue in the next chunk, so it is kept pending and merged with the
+    first bin of the next chunk.
+    """
+
+    def __init__(self, rule, how: str | list[str]='mean'):
+        """
+        Args:
+            rule: Bin width as pandas offset (e.g. '1h', '1D', 'MS')
+            how: Aggregation or list of aggregations out of AGGREGATIONS
+        """
+        hows = [how] if isinstance(how, str) else list(how)
+        unknown = [h for h in hows if h not in AGGREGATIONS]
+        if len(hows) == 0 or len(unknown) > 0:
+            raise ValueError(f"how must be one or more of {', '.join(AGGREGATIONS)}, got {how}")
+        self.rule = rule
+        self.how = how
+        self._offset = to_offset(rule)
+        self._hows = hows
+        self._name = None
+        self._origin = None
+        self._bins = []
+        self._pending = None
+
+    def update(self, chunk: pd.Series):
+        """Add the results of chunk (non-numeric results are ignored)."""
+        if chunk is None or len(chunk) == 0:
+            return self
+        chunk = _sorted(chunk)
+        if self._origin is None:
+            self._name = chunk.name
+            # origin='start_day' of the whole series, bins of a chunk would otherwise start at its own first day
+            self._origin = chunk.index[0].normalize()
+        values = pd.to_numeric(chunk, errors='coerce').astype('float64')
+        statistics = self._statistics(values)
+        if self._pending is not None:
+            first = statistics.index[0]
+            pending = self._pending.index[0]
+            if first < pending:
+                raise ValueError("Chunks must be in chronological order!")
+            if first == pending:
+                statistics = pd.concat([self._merge(self._pending, statistics.iloc[:1]), statistics.iloc[1:]])
+            else:
+                self._bins.append(self._pending)
+        if len(statistics) > 1:
+            self._bins.append(statistics.iloc[:-1])
+        self._pending = statistics.iloc[-1:]
+        return self
+
+    def _statistics(self, values):
+        """Partial statistics per bin of one chunk, with bins anchored at self._origin."""
+        if isinstance(self._offset, Tick):
+            return values.resample(self.rule, origin=self._origin).agg(_STATISTICS)
+        if isinstance(self._offset, Day) and self._offset.n > 1:
+            # pandas anchors multi-day bins at the first day of the data and ignores
+            # origin, so the calendar days since the origin are binned here instead
+            origin = self._origin.tz_localize(None)
+            days = (values.index.normalize().tz_localize(None) - origin).days.to_numpy()
+            labels = pd.DatetimeIndex(origin + pd.to_timedelta(days // self._offset.n * self._offset.n, unit='D'))
+            if values.index.tz is not None:
+                labels = labels.tz_localize(values.index.tz, ambiguous=True, nonexistent='shift_forward')
+            return values.groupby(labels).agg(_STATISTICS)
+        return values.resample(self.rule).agg(_STATISTICS)
+
+    @staticmethod
+    def _merge(previous, current):
+        a = previous.iloc[0]
+        b = current.iloc[0]
+        merged = {
+            'sum': a['sum'] + b['sum'],
+            'count': a['count'] + b['count'],
+            'min': np.fmin(a['min'], b['min']),
+            'max': np.fmax(a['max'], b['max']),
+            'first': a['first'] if a['count'] > 0 else b['first'],
+            'last': b['last'] if b['count'] > 0 else a['last']
+        }
+        return pd.DataFrame([merged], index=current.index, columns=_STATISTICS)
+
+    def result(self) -> pd.Series | pd.DataFrame | None:
+        """
+        Aggregations of all bins added so far, including empty bins between chunks.
+
+        Returns:
+            pd.Series for one aggregation, pd.DataFrame otherwise, None if nothing was added
+        """
+        if self._pending is None:
+            return None
+        statistics = pd.concat(self._bins + [self._pending]) if len(self._bins) > 0 else self._pending
+        statistics = statistics.asfreq(self.rule)
+        statistics[['sum', 'count']] = statistics[['sum', 'count']].fillna(0)
+        columns = {}
+        for how in self._hows:
+            if how == 'mean':
+                columns[how] = statistics['sum'].where(statistics['count'] > 0) / statistics['count'].where(statistics['count'] > 0)
+            elif how == 'count':
+                columns[how] = statistics['count'].astype('int64')
+            else:
+                columns[how] = statistics[how]
+        if isinstance(self.how, str):
+            return columns[self.how].rename(self._name)
+        return pd.DataFrame(columns)
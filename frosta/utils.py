@@ -1,23 +1,30 @@
-import pandas as pd
+from __future__ import annotations
 import datetime
-import pytz
-import numpy as np
+from typing import TYPE_CHECKING
 
 from frost_sta_client.model.ext.entity_list import EntityList
+from .profiling import phase
+
+# pandas is imported by the conversions themselves to keep 'import frosta' fast
+if TYPE_CHECKING:
+    import pytz
 
 def as_dataframe(entity_list):
+    import pandas as pd
     if not isinstance(entity_list, EntityList):
         raise ValueError("Only EntityLists can be converted to a DataFrame!")
     if entity_list.entity_class == 'frost_sta_client.model.observation.Observation':
         # Single-pass extraction using tuple unpacking for speed
-        data = [
-            (obs.phenomenon_time, obs.result, obs.id, obs.datastream.id) 
-            for obs in entity_list
-        ]
-        return pd.DataFrame(
-            data,
-            columns=["phenomenon_time", "result", "id", "datastream_id"]
-        )
+        with phase('iterate'):
+            data = [
+                (obs.phenomenon_time, obs.result, obs.id, obs.datastream.id) 
+                for obs in entity_list
+            ]
+        with phase('convert', rows=len(data)):
+            return pd.DataFrame(
+                data,
+                columns=["phenomenon_time", "result", "id", "datastream_id"]
+            )
     else:
         raise NotImplementedError(
             f'Conversion of EntityList of type {entity_list.entity_class} to DataFrame not yet implemented.'
@@ -35,22 +42,72 @@ def as_time_series(entity_list, tz: str | pytz.tzinfo.BaseTzInfo | datetime.time
     results = []
     name = None
     
+    with phase('iterate'):
+        for obs in entity_list:
+            if name is None:
+                name = obs.datastream.id
+            times.append(obs.phenomenon_time)
+            results.append(obs.result)
+    
+    return _to_series(times, results, name, tz)
+
+
+def iter_time_series(entity_list, chunk_size: int=100000,
+                     tz: str | pytz.tzinfo.BaseTzInfo | datetime.timezone = 'UTC'):
+    """
+    Convert an EntityList of Observations into consecutive time series chunks.
+
+    Pages are fetched as the chunks are consumed and converted observations
+    are dropped from the EntityList, so only one page and one chunk are held
+    in memory at a time. The EntityList is consumed by the iteration (and
+    progress callbacks count from the start of the current chunk).
+
+    Args:
+        entity_list: EntityList of Observations, ordered by phenomenonTime
+        chunk_size: Maximum number of observations per chunk
+        tz: Time zone of the returned indices
+
+    Yields:
+        pd.Series of up to chunk_size results indexed by phenomenonTime
+    """
+    if not isinstance(entity_list, EntityList) \
+        or entity_list.entity_class != 'frost_sta_client.model.observation.Observation':
+        raise ValueError("Only EntityLists of Observations can be converted to Time Series!")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer!")
+
+    times = []
+    results = []
+    name = None
     for obs in entity_list:
         if name is None:
             name = obs.datastream.id
         times.append(obs.phenomenon_time)
         results.append(obs.result)
-    
+        if len(times) == chunk_size:
+            # a new list object, the running iterator keeps the current page
+            entity_list.entities = []
+            yield _to_series(times, results, name, tz)
+            times = []
+            results = []
+    if len(times) > 0:
+        yield _to_series(times, results, name, tz)
+
+
+def _to_series(times, results, name, tz):
+    import pandas as pd
     # Optimize datetime parsing with utc=True for ISO8601 strings
     # This is faster than format='ISO8601' and then tz_convert
-    index = pd.to_datetime(times, utc=True)
-    
-    # Only convert timezone if it's not UTC
-    if tz != 'UTC' and tz != datetime.timezone.utc:
-        index = index.tz_convert(tz)
-    
-    return pd.Series(
-        data=results,
-        index=index,
-        name=name
-    )
+    with phase('to_datetime', rows=len(times)):
+        index = pd.to_datetime(times, utc=True)
+
+        # Only convert timezone if it's not UTC
+        if tz != 'UTC' and tz != datetime.timezone.utc:
+            index = index.tz_convert(tz)
+
+    with phase('convert', rows=len(results)):
+        return pd.Series(
+            data=results,
+            index=index,
+            name=name
+        )
@@ -26,5 +26,8 @@ setup(
         'pandas',
         'pytz'
     ],
+    extras_require={
+        'fast': ['orjson', 'brotli', 'zstandard']
+    },
     keywords=['sta', 'ogc', 'frost', 'sensorthingsapi', 'IoT']
 )